@@ -0,0 +1,149 @@
+from collections import OrderedDict
+from typing import Any, Optional
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+
+
+class ResultCache:
+    """Content-addressed cache with an in-memory LRU tier and an on-disk tier.
+
+    Entries are keyed by ``ResultCache.key``, a hash of the raw input bytes and
+    the request parameters. The memory tier holds at most ``memory_items``
+    values; the disk tier drops its least recently used files once they add up
+    to more than ``disk_bytes``.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        memory_items: int = 32,
+        disk_bytes: int = 512 * 1024**2,
+    ) -> None:
+        self.directory = directory
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self._memory: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __getstate__(self) -> dict:
+        # workers get the configuration and disk tier, not the parent's memory tier
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_memory"] = OrderedDict()
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(data: Optional[bytes], **params) -> str:
+        digest = hashlib.sha256(data or b"")
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+        value = self._read(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._remember(key, value)
+        self._write(key, value)
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else None,
+            "memory_items": len(self._memory),
+            **self.usage(),
+        }
+
+    def usage(self) -> dict:
+        """Size of the disk tier, which is shared by every process using it."""
+        files = self._files()
+        return {
+            "disk_items": len(files),
+            "disk_bytes": sum(size for _, size, _ in files),
+        }
+
+    def _remember(self, key: str, value: Any) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _read(self, key: str) -> Optional[Any]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "rb") as file:
+                value = pickle.load(file)
+            # the modification time orders files for eviction
+            os.utime(self._path(key))
+            return value
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _write(self, key: str, value: Any) -> None:
+        if not self.directory:
+            return
+        # write to a temporary file first so readers never see a partial entry
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, self._path(key))
+        self._evict()
+
+    def _files(self) -> list[tuple[float, int, str]]:
+        if not self.directory:
+            return []
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _evict(self) -> None:
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        while files and total > self.disk_bytes:
+            _, size, path = files.pop(0)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
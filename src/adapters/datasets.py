@@ -0,0 +1,104 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import pandas as pd
+import pyarrow as pa
+from src.domain.ingestion import restore_year_columns
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetRegistry:
+    """Input tables of registered workbooks, stored as one Parquet file per sheet.
+
+    Datasets are identified by a hash of the workbook they were read from, so
+    registering the same workbook twice returns the same id. Unknown ids raise
+    ``KeyError``.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def dataset_id(file: bytes) -> str:
+        return hashlib.sha256(file).hexdigest()[:16]
+
+    def save(
+        self, dataset_id: str, tables: dict[str, pd.DataFrame], metadata: dict
+    ) -> None:
+        path = self._path(dataset_id)
+        staging = tempfile.mkdtemp(
+            dir=self.directory, prefix=f"{dataset_id}.", suffix=".tmp"
+        )
+        try:
+            for sheet, table in tables.items():
+                self._write_table(os.path.join(staging, sheet), table)
+            with open(os.path.join(staging, "metadata.json"), "w") as file:
+                json.dump({**metadata, "sheets": list(tables)}, file)
+            os.replace(staging, path)
+        except OSError:
+            if not os.path.exists(os.path.join(path, "metadata.json")):
+                raise
+            # stored by a concurrent registration of the same workbook
+            logger.info("Dataset %s is already registered", dataset_id)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def load(self, dataset_id: str) -> dict[str, pd.DataFrame]:
+        path = self._path(dataset_id)
+        return {
+            sheet: self._read_table(os.path.join(path, sheet))
+            for sheet in self.metadata(dataset_id)["sheets"]
+        }
+
+    def metadata(self, dataset_id: str) -> dict:
+        try:
+            with open(os.path.join(self._path(dataset_id), "metadata.json")) as file:
+                return {"dataset_id": dataset_id, **json.load(file)}
+        except FileNotFoundError:
+            raise KeyError(dataset_id) from None
+
+    def list_datasets(self) -> list[dict]:
+        datasets = []
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and not entry.name.endswith(".tmp"):
+                try:
+                    datasets.append(self.metadata(entry.name))
+                except KeyError:  # deleted while listing
+                    continue
+        return datasets
+
+    def delete(self, dataset_id: str) -> None:
+        self.metadata(dataset_id)
+        shutil.rmtree(self._path(dataset_id))
+
+    def _path(self, dataset_id: str) -> str:
+        if not dataset_id.isalnum():
+            raise KeyError(dataset_id)
+        return os.path.join(self.directory, dataset_id)
+
+    @staticmethod
+    def _write_table(path: str, table: pd.DataFrame) -> None:
+        # Parquet needs string column names; year columns are restored on read.
+        table = table.rename(columns=str)
+        try:
+            table.to_parquet(f"{path}.parquet", index=False)
+        except (pa.ArrowTypeError, pa.ArrowInvalid) as error:
+            logger.warning(
+                "Storing %s as a pickle, it cannot be written as Parquet: %s",
+                os.path.basename(path),
+                error,
+            )
+            table.to_pickle(f"{path}.pkl")
+
+    @staticmethod
+    def _read_table(path: str) -> pd.DataFrame:
+        if os.path.exists(f"{path}.parquet"):
+            table = pd.read_parquet(f"{path}.parquet")
+        else:
+            table = pd.read_pickle(f"{path}.pkl")
+        return restore_year_columns(table)
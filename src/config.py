@@ -1,4 +1,5 @@
 from pydantic import BaseSettings  # pragma: no cover
+from typing import Optional
 import boto3
 
 
@@ -11,6 +12,12 @@ class Settings(BaseSettings):  # pragma: no cover
     db_user: str
     secret_arn: str
     access_key_id: str
+    solver_pool_size: Optional[int] = None
+    period_timeout: Optional[float] = None
+    cache_dir: str = "./src/database/cache"
+    cache_memory_items: int = 32
+    cache_disk_bytes: int = 512 * 1024**2
+    dataset_dir: str = "./src/database/datasets"
 
     class Config:
         env_file = "./src/.env"
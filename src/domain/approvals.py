@@ -1,15 +1,164 @@
 from abc import ABC, abstractmethod
 from .models import Sku, Asset
 from collections import UserDict
+from typing import Sequence
+import numpy as np
+import pandas as pd
 
 
 class ApprovalSchema(ABC, UserDict):
+    # Keys tried in order after the asset name, mirroring ``get_approval``.
+    # Each entry is either a sku field or the literal "All" wildcard.
+    lookup_keys: list[tuple[str, ...]] = []
+
     @abstractmethod
     def get_approval(self, sku: Sku, asset: Asset) -> bool:
         pass
 
+    def __setitem__(self, key, value):
+        self._reset()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._reset()
+        super().__delitem__(key)
+
+    def _reset(self) -> None:
+        self._table = None
+        self._combinations = None
+        self._compiled = None
+
+    @property
+    def key_fields(self) -> list[str]:
+        """Sku fields of the most specific key, which every fallback draws from."""
+        return list(self.lookup_keys[0])
+
+    @property
+    def table(self) -> pd.DataFrame:
+        if getattr(self, "_table", None) is None:
+            width = len(self.lookup_keys[0])
+            self._table = pd.DataFrame(
+                [(*key, start, stop) for key, (start, stop) in self.data.items()],
+                columns=["asset", *range(width), "start", "stop"],
+            ).astype({"start": "datetime64[ns]", "stop": "datetime64[ns]"})
+        return self._table
+
+    def compile(self, skus: pd.DataFrame) -> pd.DataFrame:
+        """Resolve the fallback keys once for each combination of key fields.
+
+        Returns the resolved table, one row per (combination, asset) with an
+        approval window, taken from the first key that exists as in
+        ``get_approval``. Combinations compiled before are not resolved again.
+        """
+        combinations = (
+            skus[self.key_fields].astype(object).drop_duplicates(ignore_index=True)
+        )
+        if getattr(self, "_combinations", None) is not None:
+            known = combinations.merge(self._combinations, how="left", indicator=True)[
+                "_merge"
+            ]
+            combinations = combinations[known.to_numpy() == "left_only"]
+            combinations = combinations.reset_index(drop=True)
+        if getattr(self, "_compiled", None) is None or len(combinations):
+            self._combinations = pd.concat(
+                [getattr(self, "_combinations", None), combinations],
+                ignore_index=True,
+            )
+            self._compiled = pd.concat(
+                [getattr(self, "_compiled", None), self._resolve(combinations)],
+                ignore_index=True,
+            )
+        return self._compiled
+
+    def _resolve(self, combinations: pd.DataFrame) -> pd.DataFrame:
+        columns = list(range(len(self.lookup_keys[0])))
+        matches = []
+        for level, key in enumerate(self.lookup_keys):
+            left = pd.DataFrame(
+                {
+                    column: "All" if field == "All" else combinations[field].to_numpy()
+                    for column, field in zip(columns, key)
+                }
+            )
+            left["combination"] = np.arange(len(combinations))
+            match = left.merge(self.table, on=columns)[
+                ["combination", "asset", "start", "stop"]
+            ]
+            match["level"] = level
+            matches.append(match)
+
+        matches = (
+            pd.concat(matches)
+            .sort_values("level", kind="stable")
+            .drop_duplicates(["combination", "asset"])
+        )
+        resolved = combinations.iloc[matches["combination"].to_numpy()]
+        return resolved.reset_index(drop=True).assign(
+            asset=matches["asset"].to_numpy(),
+            start=matches["start"].to_numpy(),
+            stop=matches["stop"].to_numpy(),
+        )
+
+    def coverage(self) -> pd.DataFrame:
+        """Per compiled combination, how many assets are approved and when.
+
+        Combinations with no approved asset can only go to unmet demand.
+        """
+        compiled = (
+            self._compiled
+            if getattr(self, "_compiled", None) is not None
+            else (self.compile(pd.DataFrame(columns=self.key_fields)))
+        )
+        windows = compiled.groupby(self.key_fields, dropna=False).agg(
+            assets=("asset", "nunique"),
+            first_start=("start", "min"),
+            last_stop=("stop", "max"),
+        )
+        return (
+            self._combinations.merge(
+                windows.reset_index(), on=self.key_fields, how="left"
+            )
+            .fillna({"assets": 0})
+            .astype({"assets": int})
+        )
+
+    def get_approval_matrix(
+        self, skus: pd.DataFrame, assets: Sequence[Asset]
+    ) -> np.ndarray:
+        """Approval of every sku (rows) on every asset (columns) at once.
+
+        Skus are joined with the compiled table on their key fields, then their
+        dates are compared with the approval windows.
+        """
+        approved = np.zeros((len(skus), len(assets)), dtype=bool)
+        if approved.size == 0 or not self.data:
+            return approved
+
+        compiled = self.compile(skus)
+        keys = skus[self.key_fields].astype(object).reset_index(drop=True)
+        keys["sku"] = np.arange(len(skus))
+        matches = keys.merge(compiled, on=self.key_fields)
+        matches["column"] = matches["asset"].map(
+            {asset.name: j for j, asset in enumerate(assets)}
+        )
+        matches = matches.dropna(subset=["column"])
+
+        rows = matches["sku"].to_numpy()
+        dates = pd.to_datetime(skus["date"]).to_numpy()[rows]
+        in_window = (matches["start"].to_numpy() <= dates) & (
+            dates <= matches["stop"].to_numpy()
+        )
+        approved[rows[in_window], matches["column"].to_numpy(int)[in_window]] = True
+        return approved
+
 
 class VFNApprovals(ApprovalSchema):
+    lookup_keys = [
+        ("region", "image", "product", "market"),
+        ("region", "image", "product", "All"),
+        ("All", "image", "product", "All"),
+    ]
+
     def __init__(self, data):
         super().__init__(data)
 
@@ -34,6 +183,11 @@ class VFNApprovals(ApprovalSchema):
 
 
 class VpackApprovals(ApprovalSchema):
+    lookup_keys = [
+        ("region", "image", "config", "product"),
+        ("region", "image", "config", "All"),
+    ]
+
     def __init__(self, data):
         super().__init__(data)
 
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+import logging
 import pandas as pd
 import numpy as np
 from .models import Asset
@@ -7,6 +8,8 @@ from .approvals import ApprovalSchema, VpackApprovals, VFNApprovals
 from .priorities import PriorityProvider, GeneralPriorities, VariableCosts
 from .relational_data import RunRates
 
+logger = logging.getLogger(__name__)
+
 
 def validate_table_in_data(tablename: str, data: dict):
     if data.get(tablename) is None:
@@ -24,7 +27,9 @@ class DataFormatter(ABC):
 
 class LROPloader(DataFormatter):
     @staticmethod
-    def load(demand_scenario: str, data: dict[pd.DataFrame]) -> tuple[dict, list[int]]:
+    def load(
+        demand_scenario: str, data: dict[pd.DataFrame]
+    ) -> tuple[pd.DataFrame, list[int]]:
         validate_table_in_data("LROP", data)
         lrop = data["LROP"].fillna("")
         lrop = lrop[lrop["Demand Scenario"] == demand_scenario].drop(
@@ -48,7 +53,6 @@ class LROPloader(DataFormatter):
             .reset_index()
         )
         years = sorted(lrop["Year"].unique())
-        lrop = lrop.to_dict()
         return lrop, years
 
 
@@ -85,8 +89,16 @@ class ApprovalsLoader(DataFormatter):
     def load(
         self, data: dict[pd.DataFrame], strategy: str, years: list[int]
     ) -> ApprovalSchema:
+        """Approvals for ``strategy``, compiled against the LROP when present."""
         validate_table_in_data("Approvals", data)
-        approvals = data["Approvals"]
+        approvals = self._build(data["Approvals"], strategy, years)
+        if data.get("LROP") is not None:
+            self._compile(approvals, data["LROP"])
+        return approvals
+
+    def _build(
+        self, approvals: pd.DataFrame, strategy: str, years: list[int]
+    ) -> ApprovalSchema:
         if strategy == "vpack":
             approvals = self._preformat_data(approvals, years)
             return VpackApprovals(
@@ -116,6 +128,20 @@ class ApprovalsLoader(DataFormatter):
                 detail=f"Incompatable strategy {strategy} recieved in request. Approvals could not be generated.",
             )
 
+    @staticmethod
+    def _compile(approvals: ApprovalSchema, lrop: pd.DataFrame) -> None:
+        # Sku fields are lower case strings, see Demand
+        combinations = lrop.rename(columns=str.lower)[approvals.key_fields]
+        compiled = approvals.compile(combinations.fillna("").applymap(str))
+        coverage = approvals.coverage()
+        logger.info(
+            "Compiled %d approval windows for %d LROP combinations, "
+            "%d of which have no approved asset",
+            len(compiled),
+            len(coverage),
+            int((coverage["assets"] == 0).sum()),
+        )
+
     @staticmethod
     def _preformat_data(data: pd.DataFrame, years: list[int]) -> pd.DataFrame:
         df = pd.melt(
@@ -0,0 +1,143 @@
+from typing import Iterable, Optional, Union
+import io
+import logging
+import os
+import time
+import zipfile
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Sheets read for every scenario, and per prioritization schema. Commitments
+# is optional: without it assets carry no min capacities.
+COMMON_SHEETS = ("LROP", "Capacities", "Approvals", "Run Rates", "Commitments")
+STRATEGIES = ("vpack", "vfn")
+SCHEMA_SHEETS = {
+    "General Priorities": ("General Priorities",),
+    "Variable Costs": ("Variable Costs",),
+}
+
+
+def required_sheets(prioritization_schema: str) -> list[str]:
+    """Sheets the loaders use for a schema; unknown names add none."""
+    return [*COMMON_SHEETS, *SCHEMA_SHEETS.get(prioritization_schema, ())]
+
+
+def known_sheets() -> list[str]:
+    """Every sheet any scenario reads."""
+    sheets = [*COMMON_SHEETS]
+    for extra in SCHEMA_SHEETS.values():
+        sheets.extend(sheet for sheet in extra if sheet not in sheets)
+    return sheets
+
+
+def excel_engine() -> Optional[str]:
+    """The calamine reader when pandas and python-calamine support it."""
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return None
+    major, minor = (int(part) for part in pd.__version__.split(".")[:2])
+    return "calamine" if (major, minor) >= (2, 2) else None
+
+
+def read_workbook(file, sheets: Iterable[str]) -> dict[str, pd.DataFrame]:
+    """Parse only ``sheets`` of an Excel workbook given as a path or bytes.
+
+    Sheets missing from the workbook are left out, so the loaders report them
+    as they would for a full read. Parse time is logged per sheet.
+    """
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    engine = excel_engine()
+    with pd.ExcelFile(file, engine=engine) as workbook:
+        data = {}
+        for sheet in sheets:
+            if sheet not in workbook.sheet_names:
+                continue
+            start = time.perf_counter()
+            data[sheet] = workbook.parse(sheet)
+            logger.info(
+                "Parsed sheet %s (%d rows) with %s in %.3fs",
+                sheet,
+                len(data[sheet]),
+                engine or "openpyxl",
+                time.perf_counter() - start,
+            )
+    return data
+
+
+def read_bundle(file, sheets: Iterable[str]) -> dict[str, pd.DataFrame]:
+    """Read ``sheets`` from a zip with one ``<sheet>.csv`` or ``.parquet`` each.
+
+    Members are matched on their file name, wherever they sit in the archive.
+    """
+    if isinstance(file, (bytes, bytearray)):
+        file = io.BytesIO(file)
+    with zipfile.ZipFile(file) as bundle:
+        members = {
+            os.path.splitext(os.path.basename(name)): name
+            for name in bundle.namelist()
+            if not name.endswith("/")
+        }
+        data = {}
+        for sheet in sheets:
+            for extension, read in (
+                (".parquet", pd.read_parquet),
+                (".csv", pd.read_csv),
+            ):
+                if (sheet, extension) in members:
+                    start = time.perf_counter()
+                    with bundle.open(members[sheet, extension]) as member:
+                        data[sheet] = read(io.BytesIO(member.read()))
+                    data[sheet] = restore_year_columns(data[sheet])
+                    logger.info(
+                        "Read %s%s (%d rows) in %.3fs",
+                        sheet,
+                        extension,
+                        len(data[sheet]),
+                        time.perf_counter() - start,
+                    )
+                    break
+    return data
+
+
+def read_records(
+    tables: dict[str, list[dict]], sheets: Iterable[str]
+) -> dict[str, pd.DataFrame]:
+    """Frames for ``sheets`` from JSON records keyed by sheet name."""
+    return {
+        sheet: restore_year_columns(pd.DataFrame.from_records(tables[sheet]))
+        for sheet in sheets
+        if sheet in tables
+    }
+
+
+def read_input(file, sheets: Iterable[str]) -> dict[str, pd.DataFrame]:
+    """Read ``sheets`` from an Excel workbook or a zip bundle of flat files."""
+    if is_bundle(file):
+        return read_bundle(file, sheets)
+    return read_workbook(file, sheets)
+
+
+def is_bundle(file) -> bool:
+    """Whether ``file`` is a zip archive other than an Excel workbook.
+
+    Workbooks are zip archives too, told apart by their ``[Content_Types].xml``.
+    """
+    if file is None:
+        return False
+    source = io.BytesIO(file) if isinstance(file, (bytes, bytearray)) else file
+    if not zipfile.is_zipfile(source):
+        return False
+    with zipfile.ZipFile(source) as archive:
+        return "[Content_Types].xml" not in archive.namelist()
+
+
+def restore_year_columns(table: pd.DataFrame) -> pd.DataFrame:
+    """Turn year column names like ``"2022"`` back into the ints Excel yields."""
+    return table.rename(columns=_restore_column)
+
+
+def _restore_column(column) -> Union[int, str]:
+    return int(column) if isinstance(column, str) and column.isdigit() else column
@@ -0,0 +1,251 @@
+import dataclasses
+import hashlib
+import json
+import numpy as np
+
+
+@dataclasses.dataclass
+class LinearProgram:
+    """Allocation LP in matrix form, one column per sku/asset pair.
+
+    Maximize ``cost @ x`` subject to ``row_lower <= A @ x <= row_upper`` and
+    ``0 <= x <= 1``, with ``A`` stored as CSR (``indptr``, ``indices``, ``data``).
+    Column ``k`` is the fraction of sku ``skus[k]`` allocated to asset ``assets[k]``.
+    """
+
+    shape: tuple[int, int]
+    skus: np.ndarray
+    assets: np.ndarray
+    cost: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+    row_lower: np.ndarray
+    row_upper: np.ndarray
+
+    @property
+    def num_cols(self) -> int:
+        return len(self.cost)
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.row_lower)
+
+    @classmethod
+    def build(
+        cls,
+        priorities: np.ndarray,
+        utilization: np.ndarray,
+        doses: np.ndarray,
+        min_capacities: np.ndarray,
+    ) -> "LinearProgram":
+        """Assemble the same LP as the Pyomo model straight from period arrays.
+
+        Pairs with a negative priority are left out instead of being pinned to
+        zero by a siting constraint.
+        """
+        skus, assets = np.nonzero(priorities >= 0)
+        columns = np.arange(len(skus))
+
+        # sum of a sku's fractions <= 1
+        sku_rows, sku_row_ids = np.unique(skus, return_inverse=True)
+        # utilization of an asset <= 1
+        asset_rows, asset_row_ids = np.unique(assets, return_inverse=True)
+        # doses on an asset >= its take or pay commitment
+        committed = min_capacities[assets] != 0
+        min_rows, min_row_ids = np.unique(assets[committed], return_inverse=True)
+
+        offsets = np.cumsum([0, len(sku_rows), len(asset_rows)])
+        rows = np.concatenate(
+            [
+                offsets[0] + sku_row_ids,
+                offsets[1] + asset_row_ids,
+                offsets[2] + min_row_ids,
+            ]
+        )
+        order = np.argsort(rows, kind="stable")
+        num_rows = len(sku_rows) + len(asset_rows) + len(min_rows)
+
+        return cls(
+            shape=priorities.shape,
+            skus=skus,
+            assets=assets,
+            cost=priorities[skus, assets],
+            indptr=np.concatenate(
+                [[0], np.cumsum(np.bincount(rows, minlength=num_rows))]
+            ),
+            indices=np.concatenate([columns, columns, columns[committed]])[order],
+            data=np.concatenate(
+                [
+                    np.ones(len(columns)),
+                    utilization[skus, assets],
+                    doses[skus[committed]],
+                ]
+            )[order],
+            row_lower=np.concatenate(
+                [
+                    np.full(len(sku_rows) + len(asset_rows), -np.inf),
+                    min_capacities[min_rows],
+                ]
+            ),
+            row_upper=np.concatenate(
+                [
+                    np.ones(len(sku_rows) + len(asset_rows)),
+                    np.full(len(min_rows), np.inf),
+                ]
+            ),
+        )
+
+    def structure(self) -> str:
+        """Hash of the shape and sparsity pattern.
+
+        Programs with equal structures only differ in their costs, coefficients
+        and row bounds.
+        """
+        digest = hashlib.sha256(np.array(self.shape).tobytes())
+        for array in (self.skus, self.assets, self.indptr, self.indices):
+            digest.update(np.ascontiguousarray(array, np.int64).tobytes())
+        return digest.hexdigest()
+
+    def to_allocation(self, solution: np.ndarray) -> np.ndarray:
+        """Scatter column values back into a (skus x assets) matrix."""
+        allocation = np.zeros(self.shape)
+        allocation[self.skus, self.assets] = solution
+        return allocation
+
+
+def connected_components(allowed: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Label the components of the bipartite sku/asset graph given by ``allowed``.
+
+    Returns one label per sku (row) and per asset (column); skus and assets in
+    the same component share a label, and those without any edge get -1. Labels
+    are propagated as component-wise minima until they stop changing.
+    """
+    num_skus, num_assets = allowed.shape
+    skus, assets = np.nonzero(allowed)
+    asset_labels = np.arange(num_assets)
+    while True:
+        sku_labels = np.full(num_skus, num_assets)
+        np.minimum.at(sku_labels, skus, asset_labels[assets])
+        propagated = asset_labels.copy()
+        np.minimum.at(propagated, assets, sku_labels[skus])
+        if np.array_equal(propagated, asset_labels):
+            break
+        asset_labels = propagated
+
+    sku_labels[~allowed.any(axis=1)] = -1
+    asset_labels[~allowed.any(axis=0)] = -1
+    return sku_labels, asset_labels
+
+
+@dataclasses.dataclass
+class Presolved:
+    """What presolve settled for a period, and the core left for the solver.
+
+    ``values`` holds the allocation of every settled pair; the solver fills in
+    the ``skus`` (rows) x ``assets`` (columns) core. Skus with no servable
+    asset stay at zero and so end up as unmet demand.
+    """
+
+    values: np.ndarray
+    skus: np.ndarray
+    assets: np.ndarray
+    unservable_skus: int
+    idle_assets: int
+    fixed: int
+
+    def stats(self) -> dict:
+        num_skus, num_assets = self.values.shape
+        return {
+            "skus": num_skus,
+            "assets": num_assets,
+            "unservable_skus": self.unservable_skus,
+            "idle_assets": self.idle_assets,
+            "fixed": self.fixed,
+            "core_skus": len(self.skus),
+            "core_assets": len(self.assets),
+        }
+
+
+def presolve(
+    priorities: np.ndarray,
+    utilization: np.ndarray,
+    doses: np.ndarray,
+    min_capacities: np.ndarray,
+) -> Presolved:
+    """Take out the parts of an allocation LP whose solution is known upfront.
+
+    Skus without any pair of non-negative priority can only be unmet, and
+    assets without one can only idle. A sku and an asset that only serve each
+    other form a 1x1 problem: a positive priority fills the asset up to its
+    capacity or the sku's demand, a zero priority leaves it empty. Pairs whose
+    fixed value misses a take or pay commitment are left to the solver.
+    """
+    allowed = priorities >= 0
+    servable = allowed.any(axis=1)
+    active = allowed.any(axis=0)
+
+    sku_degree = allowed.sum(axis=1)
+    asset_degree = allowed.sum(axis=0)
+    skus, assets = np.nonzero(
+        allowed & (sku_degree == 1)[:, None] & (asset_degree == 1)[None, :]
+    )
+    rates = utilization[skus, assets]
+    fraction = np.where(
+        priorities[skus, assets] > 0,
+        np.minimum(1, 1 / np.where(rates > 0, rates, 1)),
+        0,
+    )
+    settled = fraction * doses[skus] >= min_capacities[assets]
+    skus, assets, fraction = skus[settled], assets[settled], fraction[settled]
+
+    values = np.zeros(priorities.shape)
+    values[skus, assets] = fraction
+    servable[skus] = False
+    active[assets] = False
+    return Presolved(
+        values=values,
+        skus=np.flatnonzero(servable),
+        assets=np.flatnonzero(active),
+        unservable_skus=int((~allowed.any(axis=1)).sum()),
+        idle_assets=int((~allowed.any(axis=0)).sum()),
+        fixed=len(skus),
+    )
+
+
+def aggregate(
+    priorities: np.ndarray,
+    utilization: np.ndarray,
+    doses: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Merge skus with equal priorities, utilization and doses into one LP row.
+
+    Such skus give the LP identical columns, so sharing one fraction per asset
+    loses nothing: averaging any optimum over a group is feasible and scores
+    the same. The merged row weighs the priority by the group size and sums
+    utilization and doses. Returns the group of every sku along with the merged
+    priorities, utilization and doses; indexing a merged solution with the
+    groups splits it back pro rata.
+    """
+    signatures = np.column_stack([priorities, utilization, doses])
+    _, first, groups = np.unique(
+        signatures, axis=0, return_index=True, return_inverse=True
+    )
+    groups = groups.reshape(-1)
+    sizes = np.bincount(groups, minlength=len(first))
+    return (
+        groups,
+        priorities[first] * sizes[:, None],
+        utilization[first] * sizes[:, None],
+        doses[first] * sizes,
+    )
+
+
+def fingerprint(*arrays: np.ndarray, **params) -> str:
+    """Hash of the values and shapes of ``arrays`` and of ``params``."""
+    digest = hashlib.sha256(
+        b"".join(np.ascontiguousarray(array, float).tobytes() for array in arrays)
+    )
+    params = {"shapes": [array.shape for array in arrays], **params}
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
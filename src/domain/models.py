@@ -1,9 +1,9 @@
 import pandas as pd
-from typing import Iterable, Optional, Set
+from typing import Iterable, Mapping, Optional, Sequence, Set
 from pydantic.dataclasses import dataclass
 import dataclasses
 import datetime as dt
-import math
+import numpy as np
 
 
 @dataclass(frozen=True, eq=False)
@@ -131,43 +131,219 @@ class Sku:
 
 Sku.__pydantic_model__.update_forward_refs()
 
+SKU_COLUMNS = [
+    "date",
+    "material_number",
+    "image",
+    "config",
+    "region",
+    "market",
+    "country_id",
+    "product",
+    "product_id",
+    "doses",
+    "batches",
+]
+
+
+# Text columns stored as categoricals in demand and SkuTables; materials repeat
+# across months, the others have few distinct values.
+CATEGORICAL_COLUMNS = [
+    "material_number",
+    "image",
+    "config",
+    "region",
+    "market",
+    "country_id",
+    "product",
+    "product_id",
+]
+
+# (row of the period's SkuTable, asset name or None for unmet demand, doses,
+# utilization)
+AllocationRow = tuple[int, Optional[str], int, float]
+
+
+def sku_frame(skus: Sequence[Sku]) -> pd.DataFrame:
+    """Columnar view of ``skus`` (one row per sku, in order) for batch lookups."""
+    return pd.DataFrame(
+        {column: [getattr(sku, column) for sku in skus] for column in SKU_COLUMNS}
+    )
+
+
+def encode_categories(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame.astype({column: "category" for column in CATEGORICAL_COLUMNS})
+
+
+class SkuTable:
+    """Skus as columns, one row per sku of ``frame`` with the ``SKU_COLUMNS``.
+
+    Allocations add an ``allocated_to`` column of asset names and a
+    ``percent_utilization`` column. ``Sku`` objects are only created by
+    ``to_skus``, at the edge of the domain.
+    """
+
+    def __init__(self, frame: pd.DataFrame) -> None:
+        self.frame = frame
+
+    @classmethod
+    def from_skus(cls, skus: Sequence[Sku]) -> "SkuTable":
+        return cls(encode_categories(sku_frame(skus)))
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @property
+    def doses(self) -> np.ndarray:
+        return self.frame["doses"].to_numpy(float)
+
+    def take(self, positions: Sequence[int]) -> "SkuTable":
+        return SkuTable(self.frame.iloc[positions].reset_index(drop=True))
+
+    def sorted(self) -> "SkuTable":
+        """Rows ordered by every sku column, the same in every process."""
+        return SkuTable(
+            self.frame.sort_values(SKU_COLUMNS, kind="mergesort", ignore_index=True)
+        )
+
+    def allocate(self, rows: Sequence[AllocationRow]) -> "SkuTable":
+        """One row per allocation, with the doses and utilization of ``rows``."""
+        positions, assets, doses, utilization = zip(*rows) if rows else ((), (), (), ())
+        frame = self.frame.iloc[list(positions)].reset_index(drop=True)
+        frame["doses"] = np.array(doses, dtype=int)
+        frame["allocated_to"] = pd.Categorical(assets)
+        frame["percent_utilization"] = np.array(utilization, dtype=float)
+        return SkuTable(frame)
+
+    def to_skus(
+        self, assets: Optional[Mapping[Optional[str], Asset]] = None
+    ) -> list[Sku]:
+        """Materialize the rows, resolving asset names through ``assets``."""
+        columns = [self.frame[column].tolist() for column in SKU_COLUMNS[1:]]
+        dates = self.frame["date"].dt.to_pydatetime()
+        if "allocated_to" in self.frame:
+            names = self.frame["allocated_to"].cat
+            # code -1 marks unmet demand and picks the trailing assets[None]
+            allocated = [assets[name] for name in names.categories] + [assets[None]]
+            columns.append([allocated[code] for code in names.codes])
+            columns.append(self.frame["percent_utilization"].tolist())
+        return [Sku(*values) for values in zip(dates, *columns)]
+
+
 DAYS_IN_A_MONTH = 30.16
 MONTHS_IN_A_YEAR = 12
 
 
 class Demand(set):
-    def __init__(self, lrop: dict, months_to_offset: int = 0, monthize_capacity=False):
-        lrop = pd.DataFrame(lrop)
-        self.data: Set[Sku] = set()
-        if monthize_capacity:
-            for month in range(1, 13):
-                for t in lrop.itertuples(index=False):
-                    (year, *rest, doses, batches) = t
-                    self.data.add(
-                        Sku.from_tuple(
-                            (
-                                dt.datetime(year=year, month=month, day=1)
-                                - dt.timedelta(
-                                    days=(DAYS_IN_A_MONTH * months_to_offset)
-                                ),
-                                *rest,
-                                math.ceil(doses / MONTHS_IN_A_YEAR),
-                                batches,
-                            )
-                        )
-                    )
-        else:
-            for t in lrop.itertuples(index=False):
-                (year, *rest) = t
-                self.data.add(
-                    Sku.from_tuple((dt.datetime(year=year, month=1, day=1), *rest))
-                )
+    def __init__(
+        self, lrop: pd.DataFrame, months_to_offset: int = 0, monthize_capacity=False
+    ):
         self.monthize_capacity = monthize_capacity
+        self._index_periods(
+            self._demand_frame(pd.DataFrame(lrop), months_to_offset, monthize_capacity)
+        )
+        self._data: Optional[Set[Sku]] = None
+
+    @classmethod
+    def from_frame(
+        cls,
+        frame: pd.DataFrame,
+        monthize_capacity: bool,
+        period_index: Optional[dict] = None,
+    ) -> "Demand":
+        demand = cls.__new__(cls)
+        demand.monthize_capacity = monthize_capacity
+        if period_index is None:
+            demand._index_periods(frame)
+        else:
+            demand.frame, demand.period_index = frame, period_index
+        demand._data = None
+        return demand
+
+    def __reduce__(self):
+        # only the frame and its index are shipped, skus are created where needed
+        return (
+            Demand.from_frame,
+            (self.frame, self.monthize_capacity, self.period_index),
+        )
+
+    @property
+    def data(self) -> Set[Sku]:
+        """Every sku of the demand, created on first access."""
+        if self._data is None:
+            self._data = set(self._materialize(self.frame))
+        return self._data
+
+    @data.setter
+    def data(self, skus: Iterable[Sku]) -> None:
+        self._data = set(skus)
+        self._index_periods(SkuTable.from_skus(list(self._data)).frame)
+
+    def _index_periods(self, frame: pd.DataFrame) -> None:
+        """Sort ``frame`` by period and map each period to its slice of rows."""
+        frame = frame.assign(date=pd.to_datetime(frame["date"]))
+        dates = frame["date"].dt
+        years = dates.year.to_numpy()
+        months = (
+            dates.month.to_numpy() if self.monthize_capacity else np.zeros_like(years)
+        )
+        order = np.lexsort((months, years))
+        self.frame = frame.iloc[order].reset_index(drop=True)
+        keys, starts, counts = np.unique(
+            years[order] * 100 + months[order], return_index=True, return_counts=True
+        )
+        self.period_index: dict[tuple[int, Optional[int]], slice] = {
+            (int(key // 100), int(key % 100) if self.monthize_capacity else None): (
+                slice(int(start), int(start + count))
+            )
+            for key, start, count in zip(keys, starts, counts)
+        }
+
+    @staticmethod
+    def _demand_frame(
+        lrop: pd.DataFrame, months_to_offset: int, monthize_capacity: bool
+    ) -> pd.DataFrame:
+        """Sku columns for the LROP rows, spread over the months when monthized.
+
+        Values are coerced the way ``Sku`` validates them, so materialized skus
+        equal those built row by row.
+        """
+        lrop = lrop.set_axis(["year", *SKU_COLUMNS[1:]], axis=1)
+        years = {"year": lrop["year"], "month": 1, "day": 1}
+        if monthize_capacity:
+            lrop = lrop.merge(
+                pd.DataFrame({"month": range(1, MONTHS_IN_A_YEAR + 1)}), how="cross"
+            )
+            years = {"year": lrop["year"], "month": lrop["month"], "day": 1}
+            lrop["doses"] = np.ceil(
+                pd.to_numeric(lrop["doses"]) / MONTHS_IN_A_YEAR
+            ).astype(int)
+        dates = pd.to_datetime(pd.DataFrame(years))
+        if monthize_capacity:
+            # dt.timedelta rounds to microseconds like the original per-sku offset
+            dates -= pd.Timedelta(
+                dt.timedelta(days=(DAYS_IN_A_MONTH * months_to_offset))
+            )
+
+        frame = pd.DataFrame({"date": dates})
+        for column in SKU_COLUMNS[1:-2]:
+            frame[column] = lrop[column].map(str)
+        frame["doses"] = pd.to_numeric(lrop["doses"]).astype(int)
+        frame["batches"] = pd.to_numeric(lrop["batches"]).astype(float)
+        return encode_categories(frame.drop_duplicates(ignore_index=True))
+
+    @staticmethod
+    def _materialize(frame: pd.DataFrame) -> list[Sku]:
+        return SkuTable(frame).to_skus()
+
+    def periods(self) -> list[tuple[int, Optional[int]]]:
+        """Sorted (year, month) periods with demand; month is None unless monthized."""
+        return list(self.period_index)
+
+    def period_frame(self, year: int, month: Optional[int] = None) -> pd.DataFrame:
+        """Rows of one period, found through the period index."""
+        period = (year, month if self.monthize_capacity else None)
+        return self.frame.iloc[self.period_index.get(period, slice(0, 0))]
 
     def demand_for_date(self, year: int, month: Optional[int] = None) -> Iterable[Sku]:
-        for sku in self.data:
-            if self.monthize_capacity:
-                if sku.date.year == year and sku.date.month == month:
-                    yield sku
-            elif sku.date.year == year:
-                yield sku
+        return self._materialize(self.period_frame(year, month))
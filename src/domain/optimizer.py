@@ -1,14 +1,43 @@
 import pandas as pd
-import dataclasses
+import numpy as np
+import logging
+from collections import Counter, defaultdict
+from operator import attrgetter
 from .priorities import PriorityProvider
 from .relational_data import RunRates
-from .models import Demand, Sku, Asset
+from .models import AllocationRow, Demand, Sku, SkuTable, Asset
 import pyomo.environ as pe
-from pyomo.opt import SolverFactory
 import datetime as dt
-from typing import Optional
+import time
+from typing import Optional, Protocol
 from fastapi import HTTPException, status
 from .data_loaders import LROPloader, AssetLoader, PrioritiesLoader, RunRatesLoader
+from .ingestion import read_input, required_sheets
+from .solvers import get_solver
+from .linear_program import (
+    LinearProgram,
+    aggregate,
+    connected_components,
+    fingerprint,
+    presolve,
+)
+
+logger = logging.getLogger(__name__)
+
+UNMET_DEMAND = Asset(
+    "Unmet Demand", "UNMT", "ZUNMET", "N/A", "N/A", dt.datetime(2022, 1, 1), {}
+)
+
+# (year, month), with month None when the whole year is solved at once
+Period = tuple[int, Optional[int]]
+
+
+class SolutionCache(Protocol):
+    """Storage for period solutions, keyed by ``Optimizer._fingerprint``."""
+
+    def get(self, key: str) -> Optional[np.ndarray]: ...
+
+    def put(self, key: str, value: np.ndarray) -> None: ...
 
 
 class Optimizer:
@@ -21,6 +50,14 @@ class Optimizer:
         years: list[int],
         applying_take_or_pay: bool = False,
         optimize_by_month: bool = False,
+        sparse: bool = False,
+        solver: str = "glpk",
+        builder: str = "pyomo",
+        decompose: bool = False,
+        presolve: bool = False,
+        aggregate: bool = False,
+        warm_start: bool = False,
+        solution_cache: Optional[SolutionCache] = None,
     ) -> None:
         self.assets = assets
         self.demand = demand
@@ -30,158 +67,434 @@ class Optimizer:
         self.allocated_skus = set()
         self.applying_take_or_pay = applying_take_or_pay
         self.optimize_by_month = optimize_by_month
+        self.sparse = sparse
+        self.solver = get_solver(solver, persistent=warm_start)
+        self.solve_times = {}
+        self.presolve_stats = {}
+        if builder not in ("pyomo", "matrix"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown model builder {builder} recieved in request.",
+            )
+        if builder == "matrix" and not self.solver.solves_matrices:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"The {solver} solver does not support the matrix builder.",
+            )
+        if warm_start and builder != "matrix":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Warm starts require the matrix builder.",
+            )
+        self.builder = builder
+        self.decompose = decompose
+        self.presolve = presolve
+        self.aggregate = aggregate
+        self.solution_cache = solution_cache
 
-    def optimize_period(self, year: int, month: Optional[int] = None):
-        print(year, month)
-        model = pe.ConcreteModel()
-        skus = set(self.demand.demand_for_date(year, month))
+    @property
+    def periods(self) -> list[Period]:
+        """Period tasks to solve: (year, month) when monthized, else (year, None)."""
+        if self.demand.monthize_capacity:
+            return self.demand.periods()
+        return [(int(year), None) for year in self.years]
+
+    def period_table(self, year: int, month: Optional[int] = None) -> SkuTable:
+        """The period's demand in an order that is identical in every process."""
+        return SkuTable(self.demand.period_frame(year, month)).sorted()
+
+    def optimize_period(self, year: int, month: Optional[int] = None) -> set[Sku]:
+        table, rows = self._allocate(year, month)
+        return set(table.allocate(rows).to_skus(self._asset_names()))
+
+    def allocate_period(
+        self, year: int, month: Optional[int] = None
+    ) -> list[AllocationRow]:
+        """Solve a period and return its allocation as compact rows.
+
+        Rows refer to skus by position in ``period_table`` so they can be sent
+        between processes and turned back into skus by ``materialize_period``.
+        """
+        return self._allocate(year, month)[1]
+
+    def allocation_table(
+        self, year: int, month: Optional[int], rows: list[AllocationRow]
+    ) -> SkuTable:
+        return self.period_table(year, month).allocate(rows)
+
+    def materialize_period(
+        self, year: int, month: Optional[int], rows: list[AllocationRow]
+    ) -> set[Sku]:
+        return set(
+            self.allocation_table(year, month, rows).to_skus(self._asset_names())
+        )
+
+    def _asset_names(self) -> dict[Optional[str], Asset]:
+        return {None: UNMET_DEMAND, **{asset.name: asset for asset in self.assets}}
+
+    def _allocate(
+        self, year: int, month: Optional[int]
+    ) -> tuple[SkuTable, list[AllocationRow]]:
+        logger.debug("Allocating period %s-%s", year, month)
+        table = self.period_table(year, month)
         optimization_date = (
             dt.datetime(year, month, 1) if month else dt.datetime(year, 1, 1)
         )
-        assets = {
-            asset for asset in self.assets if asset.launch_date <= optimization_date
-        }
-        model.q_sku_asset = pe.Var(skus, assets, bounds=(0, 1))
+        assets = sorted(
+            (asset for asset in self.assets if asset.launch_date <= optimization_date),
+            key=attrgetter("name"),
+        )
+        priorities = self.priorities.get_priority_matrix(table.frame, assets)
+        utilization = self.run_rates.get_utilization_matrix(table.frame, assets)
+        min_capacities = np.zeros(len(assets))
+        if self.applying_take_or_pay:
+            min_capacities[:] = [
+                (asset.min_capacities or {}).get(year, 0) for asset in assets
+            ]
+        if np.any((min_capacities != 0) & ~(priorities >= 0).any(axis=0)):
+            raise self._did_not_converge(year, month)
 
-        def siting_constraint(model, sku, asset):
-            return (
-                model.q_sku_asset[sku, asset] * self.priorities.get_priority(sku, asset)
-                >= 0
+        doses = table.doses
+        values = None
+        if self.solution_cache is not None:
+            key = self._fingerprint(priorities, utilization, doses, min_capacities)
+            values = self.solution_cache.get(key)
+            if values is not None:
+                logger.info("Period %s-%s: reusing cached solution", year, month)
+        if values is None:
+            if self.aggregate:
+                groups, *merged = aggregate(priorities, utilization, doses)
+                logger.info(
+                    "Period %s-%s: aggregated %d skus into %d LP rows",
+                    year,
+                    month,
+                    len(table),
+                    len(merged[0]),
+                )
+                values = self._solve_period(
+                    year, month, assets, *merged, min_capacities
+                )[groups]
+            else:
+                values = self._solve_period(
+                    year, month, assets, priorities, utilization, doses, min_capacities
+                )
+            if self.solution_cache is not None and not np.isnan(values).any():
+                self.solution_cache.put(key, values)
+
+        return table, self._extract_solution_from(values, table, assets, utilization)
+
+    def _solve_period(
+        self,
+        year: int,
+        month: Optional[int],
+        assets: list[Asset],
+        priorities: np.ndarray,
+        utilization: np.ndarray,
+        doses: np.ndarray,
+        min_capacities: np.ndarray,
+    ) -> np.ndarray:
+        values = np.zeros(priorities.shape)
+        core_skus, core_assets = np.arange(len(priorities)), np.arange(len(assets))
+        if self.presolve:
+            presolved = presolve(priorities, utilization, doses, min_capacities)
+            values = presolved.values
+            core_skus, core_assets = presolved.skus, presolved.assets
+            self.presolve_stats[year, month] = presolved.stats()
+            logger.info(
+                "Period %s-%s: presolve sent %d of %d skus to unmet demand, "
+                "dropped %d of %d idle assets and fixed %d pairs, leaving %d "
+                "skus and %d assets",
+                year,
+                month,
+                presolved.unservable_skus,
+                len(priorities),
+                presolved.idle_assets,
+                len(assets),
+                presolved.fixed,
+                len(core_skus),
+                len(core_assets),
+            )
+
+        if self.decompose:
+            sku_labels, asset_labels = connected_components(
+                priorities[np.ix_(core_skus, core_assets)] >= 0
+            )
+            blocks = [
+                (core_skus[sku_labels == label], core_assets[asset_labels == label])
+                for label in np.unique(sku_labels[sku_labels >= 0])
+            ]
+        else:
+            blocks = [(core_skus, core_assets)]
+        if self.presolve:
+            blocks = [(rows, columns) for rows, columns in blocks if len(rows)]
+
+        stats = Counter()
+        for rows, columns in blocks:
+            block = np.ix_(rows, columns)
+            values[block] = self._solve(
+                priorities[block],
+                utilization[block],
+                doses[rows],
+                min_capacities[columns],
+                stats,
+            )
+        self.solve_times[year, month] = stats["solve_time"]
+        logger.info(
+            "Period %s-%s: built %d %s %s model(s) with %d variables and %d "
+            "constraints in %.3fs, solved with %s in %.3fs",
+            year,
+            month,
+            len(blocks),
+            "sparse" if self.sparse or self.builder == "matrix" else "dense",
+            self.builder,
+            stats["variables"],
+            stats["constraints"],
+            stats["build_time"],
+            self.solver.name,
+            stats["solve_time"],
+        )
+
+        return values
+
+    def _fingerprint(self, *arrays: np.ndarray) -> str:
+        """Hash of a period's coefficients and of everything else its solve uses.
+
+        Skus are ordered by ``period_table`` and assets by name, so equal
+        coefficient arrays describe the same model.
+        """
+        return fingerprint(
+            *arrays,
+            solver=self.solver.name,
+            builder=self.builder,
+            sparse=self.sparse,
+            decompose=self.decompose,
+            presolve=self.presolve,
+            aggregate=self.aggregate,
+            warm_start=self.solver.persistent,
+        )
+
+    def _solve(
+        self,
+        priorities: np.ndarray,
+        utilization: np.ndarray,
+        doses: np.ndarray,
+        min_capacities: np.ndarray,
+        stats: Counter,
+    ) -> np.ndarray:
+        """Build and solve one allocation LP, returning its value matrix."""
+        start = time.perf_counter()
+        if self.builder == "matrix":
+            program = LinearProgram.build(
+                priorities, utilization, doses, min_capacities
+            )
+            stats["variables"] += program.num_cols
+            stats["constraints"] += program.num_rows
+        else:
+            model = self._build_model(doses, priorities, utilization, min_capacities)
+            stats["variables"] += model.nvariables()
+            stats["constraints"] += model.nconstraints()
+        stats["build_time"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        if self.builder == "matrix":
+            solution = self.solver.solve_matrix(program)
+            values = program.to_allocation(
+                np.full(program.num_cols, np.nan) if solution is None else solution
+            )
+        else:
+            self.solver.solve(model)
+            self.solved_model = model
+            values = self._values_from(model, priorities.shape)
+        stats["solve_time"] += time.perf_counter() - start
+        return values
+
+    def _build_model(
+        self,
+        doses: np.ndarray,
+        priorities: np.ndarray,
+        utilization: np.ndarray,
+        min_capacities: np.ndarray,
+    ) -> pe.ConcreteModel:
+        """Allocation model indexed by sku (row) and asset (column) positions."""
+        model = pe.ConcreteModel()
+        num_skus, num_assets = priorities.shape
+        model.skus = pe.RangeSet(0, num_skus - 1)
+        model.assets = pe.RangeSet(0, num_assets - 1)
+
+        if self.sparse:
+            # Pairs with a negative priority are pinned to zero by the siting
+            # constraint, so they are never created in the first place.
+            pairs = [(int(i), int(j)) for i, j in zip(*np.nonzero(priorities >= 0))]
+            model.pairs = pe.Set(
+                initialize=pairs, dimen=2, within=model.skus * model.assets
+            )
+            model.q_sku_asset = pe.Var(model.pairs, bounds=(0, 1))
+        else:
+            pairs = [(i, j) for i in range(num_skus) for j in range(num_assets)]
+            model.q_sku_asset = pe.Var(model.skus, model.assets, bounds=(0, 1))
+
+            def siting_constraint(model, i, j):
+                return model.q_sku_asset[i, j] * priorities[i, j] >= 0
+
+            model.siting_constraint = pe.Constraint(
+                model.skus, model.assets, rule=siting_constraint
             )
 
-        model.siting_constraint = pe.Constraint(skus, assets, rule=siting_constraint)
+        assets_for_sku = defaultdict(list)
+        skus_for_asset = defaultdict(list)
+        for i, j in pairs:
+            assets_for_sku[i].append(j)
+            skus_for_asset[j].append(i)
 
-        def sku_constraint(model, sku):
-            return sum(model.q_sku_asset[sku, asset] for asset in assets) <= 1
+        def sku_constraint(model, i):
+            if not assets_for_sku[i]:
+                return pe.Constraint.Skip
+            return sum(model.q_sku_asset[i, j] for j in assets_for_sku[i]) <= 1
 
-        model.sku_constraint = pe.Constraint(skus, rule=sku_constraint)
+        model.sku_constraint = pe.Constraint(model.skus, rule=sku_constraint)
 
         if self.applying_take_or_pay:
 
-            def asset_min_capacity_constraint(model, asset: Asset):
-                if asset.min_capacities[year] == 0:
+            def asset_min_capacity_constraint(model, j):
+                if min_capacities[j] == 0:
                     return pe.Constraint.Skip
                 return (
-                    sum(model.q_sku_asset[sku, asset] * sku.doses for sku in skus)
-                    >= asset.min_capacities[year]
+                    sum(model.q_sku_asset[i, j] * doses[i] for i in skus_for_asset[j])
+                    >= min_capacities[j]
                 )
 
             model.site_min_constraint = pe.Constraint(
-                assets, rule=asset_min_capacity_constraint
+                model.assets, rule=asset_min_capacity_constraint
             )
 
-        def site_max_capacity_constraint(model, asset: Asset):
+        def site_max_capacity_constraint(model, j):
+            if not skus_for_asset[j]:
+                return pe.Constraint.Skip
             return (
                 sum(
-                    model.q_sku_asset[sku, asset]
-                    * self.run_rates.get_utilization(sku, asset)
-                    for sku in skus
+                    model.q_sku_asset[i, j] * utilization[i, j]
+                    for i in skus_for_asset[j]
                 )
                 <= 1
             )
 
         model.asset_max_capacity_constraint = pe.Constraint(
-            assets, rule=site_max_capacity_constraint
+            model.assets, rule=site_max_capacity_constraint
         )
 
         def objective_function(model):
-            return sum(
-                sum(
-                    model.q_sku_asset[sku, asset]
-                    * self.priorities.get_priority(sku, asset)
-                    for asset in assets
-                )
-                for sku in skus
-            )
+            return sum(model.q_sku_asset[i, j] * priorities[i, j] for i, j in pairs)
 
         model.value = pe.Objective(rule=objective_function, sense=pe.maximize)
 
-        opt = SolverFactory("glpk")
-        opt.solve(model)
-
-        self.solved_model = model
+        return model
 
-        return self._extract_solution_from(model, skus, assets)
+    @staticmethod
+    def _values_from(solved_model: pe.ConcreteModel, shape: tuple) -> np.ndarray:
+        """Variable values as a (skus x assets) matrix, NaN where unsolved."""
+        values = np.zeros(shape)
+        for (i, j), variable in solved_model.q_sku_asset.items():
+            values[i, j] = np.nan if variable.value is None else variable.value
+        return values
 
     def _extract_solution_from(
-        self, solved_model: pe.ConcreteModel, skus: set[Sku], assets: set[Asset]
-    ):
-        unmet_demand = Asset(
-            "Unmet Demand", "UNMT", "ZUNMET", "N/A", "N/A", dt.datetime(2022, 1, 1), {}
+        self,
+        values: np.ndarray,
+        table: SkuTable,
+        assets: list[Asset],
+        utilization: np.ndarray,
+    ) -> list[AllocationRow]:
+        """Allocation rows for every fraction above 0.001, sku by sku.
+
+        Each sku's rows follow asset order and end with its unmet remainder,
+        if any, allocated to ``None``.
+        """
+        unsolved = np.isnan(values).any(axis=1)
+        if unsolved.any():
+            date = table.frame["date"].iloc[np.argmax(unsolved)]
+            raise self._did_not_converge(date.year, date.month)
+
+        doses = table.doses
+        allocated = values > 0.001
+        unallocated = np.ones(len(table))
+        for j in range(len(assets)):
+            unallocated -= np.where(allocated[:, j], values[:, j], 0)
+        skus, columns = np.nonzero(allocated)
+        fractions = values[skus, columns]
+        unmet = np.flatnonzero(unallocated > 0)
+
+        positions = np.r_[skus, unmet]
+        names = np.array([asset.name for asset in assets] + [None], dtype=object)
+        allocated_to = names[np.r_[columns, np.full(len(unmet), len(assets))]]
+        allocated_doses = np.round(
+            np.r_[doses[skus] * fractions, doses[unmet] * unallocated[unmet]]
+        ).astype(int)
+        percent_utilization = np.r_[
+            fractions * utilization[skus, columns], np.zeros(len(unmet))
+        ]
+
+        # a sku's unmet remainder sorts after its asset rows
+        order = np.lexsort((np.r_[np.zeros(len(skus)), np.ones(len(unmet))], positions))
+        return list(
+            zip(
+                positions[order].tolist(),
+                allocated_to[order].tolist(),
+                allocated_doses[order].tolist(),
+                percent_utilization[order].tolist(),
+            )
         )
 
-        allocated_skus = set()
-        for sku in skus:
-            unallocated = 1
-            for asset in assets:
-                if solved_model.q_sku_asset[sku, asset].value is None:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"""Model did not Converge for {sku.date.year, sku.date.month}.
+    @staticmethod
+    def _did_not_converge(year: int, month: Optional[int]) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"""Model did not Converge for {year, month}.
                         Check your input file and take or pays.""",
-                    )
-                if (
-                    sku.product == "Gardasil 9"
-                    and asset.name == "Coral"
-                    and solved_model.q_sku_asset[sku, asset].value > 0
-                ):
-                    print(
-                        asset.name,
-                        sku.product,
-                        self.priorities.get_priority(sku, asset),
-                        solved_model.q_sku_asset[sku, asset].value,
-                    )
-                if solved_model.q_sku_asset[sku, asset].value > 0.001:
-                    allocated_skus.add(
-                        dataclasses.replace(
-                            sku,
-                            doses=round(
-                                sku.doses * solved_model.q_sku_asset[sku, asset].value
-                            ),
-                            allocated_to=asset,
-                            percent_utilization=self.run_rates.get_utilization(
-                                sku,
-                                asset,
-                                solved_model.q_sku_asset[sku, asset].value,
-                            ),
-                        )
-                    )
-                    unallocated -= solved_model.q_sku_asset[sku, asset].value
-            if unallocated > 0:
-                allocated_skus.add(
-                    dataclasses.replace(
-                        sku,
-                        doses=round(sku.doses * unallocated),
-                        allocated_to=unmet_demand,
-                        percent_utilization=0,
-                    )
-                )
-
-        return allocated_skus
+        )
 
 
 class OptimizerBuilder:
     def __init__(self, demand_scenario: str, prioritization_schema: str, file) -> None:
-        self._data = pd.read_excel(file, sheet_name=None)
+        self.file = file
+        self.tables = None
         self.demand_scenario = demand_scenario
         self.prioritization_schema = prioritization_schema
 
-    def build_optimizer(self, strategy: str):
-        lrop, years = LROPloader().load(self.demand_scenario, self._data)
-        assets = AssetLoader().load(self._data)
+    @classmethod
+    def from_tables(
+        cls,
+        demand_scenario: str,
+        prioritization_schema: str,
+        tables: dict[str, pd.DataFrame],
+    ) -> "OptimizerBuilder":
+        """Build from already parsed sheets, e.g. those of a registered dataset."""
+        builder = cls(demand_scenario, prioritization_schema, None)
+        builder.tables = tables
+        return builder
+
+    def build_optimizer(self, strategy: str, **options):
+        if self.tables is not None:
+            data = self.tables
+        else:
+            data = read_input(self.file, required_sheets(self.prioritization_schema))
+        lrop, years = LROPloader().load(self.demand_scenario, data)
+        assets = AssetLoader().load(data)
         priorities = PrioritiesLoader().load(
-            self._data, strategy, self.prioritization_schema, years
+            data, strategy, self.prioritization_schema, years
         )
-        run_rates = RunRatesLoader().load(self._data)
+        run_rates = RunRatesLoader().load(data)
 
         if strategy == "vpack":
-            return Optimizer(assets, Demand(lrop), priorities, run_rates, years)
+            return Optimizer(
+                assets, Demand(lrop), priorities, run_rates, years, **options
+            )
         elif strategy == "vfn":
             return Optimizer(
                 assets,
                 Demand(lrop, months_to_offset=6, monthize_capacity=True),
                 priorities,
                 run_rates,
-                years[-1],
+                years,
                 applying_take_or_pay=True,
+                **options,
             )
@@ -1,7 +1,10 @@
 from abc import ABC, abstractmethod
 from .models import Sku, Asset
 from collections import UserDict
+from typing import Sequence
 from .approvals import ApprovalSchema
+import numpy as np
+import pandas as pd
 
 BIG_M = -10
 
@@ -14,6 +17,52 @@ class PrioritizationSchema(UserDict, ABC):
     def get_priority(self, sku: Sku, asset: Asset) -> float:
         pass
 
+    @abstractmethod
+    def get_priority_matrix(
+        self, skus: pd.DataFrame, assets: Sequence[Asset]
+    ) -> np.ndarray:
+        pass
+
+    def __setitem__(self, key, value):
+        self._tables = {}
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._tables = {}
+        super().__delitem__(key)
+
+    def _table(self, width: int) -> pd.DataFrame:
+        """Entries keyed by ``width``-tuples as an (asset, *key, value) frame."""
+        tables = getattr(self, "_tables", None) or {}
+        if width not in tables:
+            tables[width] = pd.DataFrame(
+                [
+                    (*key, value)
+                    for key, value in self.data.items()
+                    if isinstance(key, tuple) and len(key) == width
+                ],
+                columns=["asset", *range(1, width), "value"],
+            ).astype({column: object for column in range(1, width)})
+            self._tables = tables
+        return tables[width]
+
+    def _lookup_matrix(
+        self, keys: dict, assets: Sequence[Asset], default: float
+    ) -> np.ndarray:
+        """Join per-sku ``keys`` against the table, one row per sku."""
+        values = pd.DataFrame(keys).astype(object)
+        matrix = np.full((len(values), len(assets)), default, dtype=float)
+        values["sku"] = np.arange(len(values))
+        matches = values.merge(self._table(len(keys) + 1), on=list(keys))
+        columns = matches["asset"].map(
+            {asset.name: j for j, asset in enumerate(assets)}
+        )
+        found = columns.notna().to_numpy()
+        matrix[
+            matches["sku"].to_numpy()[found], columns.to_numpy()[found].astype(int)
+        ] = pd.to_numeric(matches["value"][found], errors="coerce")
+        return matrix
+
 
 class VariableCosts(PrioritizationSchema):
     def __init__(self, data: dict):
@@ -24,6 +73,16 @@ class VariableCosts(PrioritizationSchema):
             return 10 - self.data.get((asset.name, "All", sku.product), 9)
         return 10 - self.data.get((asset.name, sku.date.year, sku.product))
 
+    def get_priority_matrix(self, skus: pd.DataFrame, assets: Sequence[Asset]):
+        products = skus["product"].to_numpy()
+        costs = self._lookup_matrix(
+            {1: pd.to_datetime(skus["date"]).dt.year.to_numpy(), 2: products},
+            assets,
+            np.nan,
+        )
+        fallback = self._lookup_matrix({1: "All", 2: products}, assets, 9)
+        return 10 - np.where(np.isnan(costs), fallback, costs)
+
 
 class GeneralPriorities(PrioritizationSchema):
     def __init__(self, data: dict):
@@ -41,6 +100,22 @@ class GeneralPriorities(PrioritizationSchema):
             / 10
         )
 
+    def get_priority_matrix(self, skus: pd.DataFrame, assets: Sequence[Asset]):
+        site = pd.to_numeric(
+            pd.Series([self.data.get(asset.name) for asset in assets], dtype=object),
+            errors="coerce",
+        ).to_numpy(float)
+        return (
+            10
+            - (
+                site
+                + self._lookup_matrix({1: skus["region"].to_numpy()}, assets, 5)
+                + self._lookup_matrix({1: skus["product"].to_numpy()}, assets, 5)
+                + self._lookup_matrix({1: skus["config"].to_numpy()}, assets, 5)
+            )
+            / 10
+        )
+
 
 class PriorityProvider:
     def __init__(
@@ -55,3 +130,19 @@ class PriorityProvider:
         if self.approvals.get_approval(sku, asset):
             return self.prioritization_scheme.get_priority(sku, asset)
         return BIG_M
+
+    def get_priority_matrix(
+        self, skus: pd.DataFrame, assets: Sequence[Asset]
+    ) -> np.ndarray:
+        """Priorities of every sku (rows) on every asset (columns).
+
+        ``skus`` is a frame with the ``models.SKU_COLUMNS``, such as a
+        ``SkuTable.frame``.
+        """
+        if len(skus) == 0 or len(assets) == 0:
+            return np.zeros((len(skus), len(assets)))
+        return np.where(
+            self.approvals.get_approval_matrix(skus, assets),
+            self.prioritization_scheme.get_priority_matrix(skus, assets),
+            BIG_M,
+        )
@@ -1,5 +1,10 @@
 from collections import UserDict
+from typing import Sequence
 from .models import Sku, Asset
+import numpy as np
+import pandas as pd
+
+UNDEFINED_UTILIZATION = 1000000
 
 
 class RunRates(UserDict):
@@ -14,4 +19,50 @@ class RunRates(UserDict):
                 / asset.capacities[sku.date.year]
             )
         except (ZeroDivisionError, KeyError):
-            return 1000000
+            return UNDEFINED_UTILIZATION
+
+    def get_utilization_matrix(
+        self, skus: pd.DataFrame, assets: Sequence[Asset]
+    ) -> np.ndarray:
+        """Utilization of every sku (rows) on every asset (columns) in one pass.
+
+        Pairs without a run rate, or with a zero rate or capacity, are masked
+        to ``UNDEFINED_UTILIZATION`` instead of raising.
+        """
+        names = [asset.name for asset in assets]
+        rates = pd.DataFrame(
+            [(*key, rate, cuco) for key, (rate, cuco) in self.data.items()],
+            columns=["asset", "image", "config", "rate", "cuco"],
+        )
+        rates = rates[rates["asset"].isin(names)]
+        rates["column"] = rates["asset"].map({name: j for j, name in enumerate(names)})
+        matches = (
+            skus[["image", "config"]]
+            .reset_index(drop=True)
+            .rename_axis("sku")
+            .reset_index()
+            .merge(rates, on=["image", "config"])
+        )
+        rate = np.full((len(skus), len(assets)), np.nan)
+        cuco = np.full((len(skus), len(assets)), np.nan)
+        rows, columns = matches["sku"].to_numpy(), matches["column"].to_numpy(int)
+        rate[rows, columns] = pd.to_numeric(matches["rate"], errors="coerce")
+        cuco[rows, columns] = pd.to_numeric(matches["cuco"], errors="coerce")
+
+        years, year_codes = np.unique(
+            pd.to_datetime(skus["date"]).dt.year.to_numpy(), return_inverse=True
+        )
+        capacities = pd.to_numeric(
+            pd.Series(
+                [asset.capacities.get(year) for year in years for asset in assets],
+                dtype=object,
+            ),
+            errors="coerce",
+        ).to_numpy(float)
+        capacity = capacities.reshape(len(years), len(assets))[year_codes]
+
+        doses = skus["doses"].to_numpy(float)[:, None]
+        batches = skus["batches"].to_numpy(float)[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            utilization = ((doses / rate) + (cuco * batches)) / capacity
+        return np.where(np.isfinite(utilization), utilization, UNDEFINED_UTILIZATION)
@@ -0,0 +1,185 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+import pyomo.environ as pe
+from pyomo.opt import SolverFactory
+from pyomo.contrib.appsi.base import TerminationCondition
+from pyomo.contrib.appsi.solvers import Highs
+from fastapi import HTTPException, status
+from .linear_program import LinearProgram
+
+try:
+    import highspy
+except ImportError:  # pragma: no cover
+    highspy = None
+
+
+class SolverBackend(ABC):
+    name: str
+    solves_matrices = False
+
+    def __init__(self, persistent: bool = False) -> None:
+        self.persistent = persistent
+
+    @abstractmethod
+    def solve(self, model: pe.ConcreteModel) -> None:
+        """Solve ``model`` in place, leaving variable values unset on failure."""
+        pass
+
+    @abstractmethod
+    def solve_matrix(self, program: LinearProgram) -> Optional[np.ndarray]:
+        """Column values of ``program``, or None if no optimum was found."""
+        pass
+
+
+class GLPKSolver(SolverBackend):
+    name = "glpk"
+
+    def solve(self, model: pe.ConcreteModel) -> None:
+        SolverFactory("glpk").solve(model)
+
+    def solve_matrix(self, program: LinearProgram) -> Optional[np.ndarray]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The {self.name} solver does not support the matrix builder.",
+        )
+
+
+class HiGHSSolver(SolverBackend):
+    """Solves in-process through the HiGHS Python bindings, without temp files.
+
+    When ``persistent``, matrix programs are kept loaded in HiGHS, one instance
+    per sparsity structure. A later program with the same structure only
+    updates the costs, coefficients and row bounds that changed, and HiGHS
+    starts from the basis of the previous solve.
+    """
+
+    name = "highs"
+    solves_matrices = True
+    # Loaded programs kept per solver, most recently used last.
+    PERSISTENT_MODELS = 8
+    # Share of changed coefficients above which a program is passed again, with
+    # the previous basis, rather than changed one coefficient call at a time.
+    RELOAD_SHARE = 0.1
+
+    def __init__(self, persistent: bool = False) -> None:
+        if highspy is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The highs solver requires the highspy package to be installed.",
+            )
+        super().__init__(persistent)
+        self._models: OrderedDict[str, tuple[highspy.Highs, LinearProgram]] = (
+            OrderedDict()
+        )
+
+    def __getstate__(self) -> dict:
+        # loaded HiGHS instances cannot be pickled, workers load their own
+        state = self.__dict__.copy()
+        state["_models"] = OrderedDict()
+        return state
+
+    def solve(self, model: pe.ConcreteModel) -> None:
+        solver = Highs()
+        solver.config.load_solution = False
+        results = solver.solve(model)
+        if results.termination_condition == TerminationCondition.optimal:
+            results.solution_loader.load_vars()
+
+    def solve_matrix(self, program: LinearProgram) -> Optional[np.ndarray]:
+        solver = self._reuse(program) if self.persistent else self._load(program)
+        solver.run()
+        if solver.getModelStatus() != highspy.HighsModelStatus.kOptimal:
+            return None
+        return np.array(solver.getSolution().col_value)
+
+    @classmethod
+    def _load(cls, program: LinearProgram) -> "highspy.Highs":
+        solver = highspy.Highs()
+        solver.setOptionValue("output_flag", False)
+        solver.passModel(cls._lp(program))
+        return solver
+
+    @staticmethod
+    def _lp(program: LinearProgram) -> "highspy.HighsLp":
+        lp = highspy.HighsLp()
+        lp.num_col_ = program.num_cols
+        lp.num_row_ = program.num_rows
+        lp.sense_ = highspy.ObjSense.kMaximize
+        lp.col_cost_ = program.cost
+        lp.col_lower_ = np.zeros(program.num_cols)
+        lp.col_upper_ = np.ones(program.num_cols)
+        lp.row_lower_ = np.maximum(program.row_lower, -highspy.kHighsInf)
+        lp.row_upper_ = np.minimum(program.row_upper, highspy.kHighsInf)
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+        lp.a_matrix_.num_col_ = program.num_cols
+        lp.a_matrix_.num_row_ = program.num_rows
+        lp.a_matrix_.start_ = program.indptr
+        lp.a_matrix_.index_ = program.indices
+        lp.a_matrix_.value_ = program.data
+        return lp
+
+    def _reuse(self, program: LinearProgram) -> "highspy.Highs":
+        key = program.structure()
+        if key in self._models:
+            solver, previous = self._models.pop(key)
+            self._update(solver, previous, program)
+        else:
+            solver = self._load(program)
+        self._models[key] = (solver, program)
+        while len(self._models) > self.PERSISTENT_MODELS:
+            self._models.popitem(last=False)
+        return solver
+
+    @classmethod
+    def _update(
+        cls, solver: "highspy.Highs", previous: LinearProgram, program: LinearProgram
+    ) -> None:
+        """Change a loaded ``previous`` program into ``program`` in place.
+
+        Coefficients can only be changed one call at a time, so when many of
+        them differ the program is passed again and the previous basis restored.
+        """
+        entries = np.flatnonzero(previous.data != program.data)
+        if len(entries) > cls.RELOAD_SHARE * len(program.data):
+            basis = solver.getBasis()
+            solver.passModel(cls._lp(program))
+            solver.setBasis(basis)
+            return
+
+        columns = np.flatnonzero(previous.cost != program.cost)
+        if len(columns):
+            solver.changeColsCost(len(columns), columns, program.cost[columns])
+
+        rows = np.flatnonzero(
+            (previous.row_lower != program.row_lower)
+            | (previous.row_upper != program.row_upper)
+        )
+        if len(rows):
+            solver.changeRowsBounds(
+                len(rows),
+                rows,
+                np.maximum(program.row_lower[rows], -highspy.kHighsInf),
+                np.minimum(program.row_upper[rows], highspy.kHighsInf),
+            )
+
+        entry_rows = np.repeat(np.arange(program.num_rows), np.diff(program.indptr))
+        for k in entries:
+            solver.changeCoeff(
+                int(entry_rows[k]), int(program.indices[k]), float(program.data[k])
+            )
+
+
+SOLVERS = {solver.name: solver for solver in (GLPKSolver, HiGHSSolver)}
+
+
+def get_solver(name: str, persistent: bool = False) -> SolverBackend:
+    try:
+        solver = SOLVERS[name]
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown solver {name} recieved in request. Expected one of {list(SOLVERS)}.",
+        )
+    return solver(persistent)
@@ -1,18 +1,83 @@
-from fastapi import Depends, FastAPI, File, Response, status
-from ..services import services
+from fastapi import Body, Depends, FastAPI, File, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from ..services import jobs, services
 from ..domain import models
 import src.adapters.repository as repository
+from src.adapters.cache import ResultCache
+from src.adapters.datasets import DatasetRegistry
 from typing import Optional
 import sqlite3
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import src.config as config
 import uvicorn
-import multiprocessing
+import logging
+import os
+
+logging.basicConfig(level=logging.INFO)
 
 app = FastAPI()
 
 
+@app.on_event("startup")
+def start_solver_pool():
+    app.state.solver_pool = services.start_solver_pool(config.settings.solver_pool_size)
+    app.state.jobs = jobs.JobRegistry(
+        app.state.solver_pool, period_timeout=config.settings.period_timeout
+    )
+    app.state.result_cache = ResultCache(
+        config.settings.cache_dir,
+        config.settings.cache_memory_items,
+        config.settings.cache_disk_bytes,
+    )
+    app.state.datasets = DatasetRegistry(config.settings.dataset_dir)
+    app.state.solution_cache = ResultCache(
+        os.path.join(config.settings.cache_dir, "periods"),
+        config.settings.cache_memory_items,
+        config.settings.cache_disk_bytes,
+    )
+
+
+@app.on_event("shutdown")
+def stop_solver_pool():
+    app.state.jobs.shutdown()
+    app.state.solver_pool.close()
+    app.state.solver_pool.join()
+
+
+def get_solver_pool(request: Request) -> services.SolverPool:
+    return request.app.state.solver_pool
+
+
+def get_job_registry(request: Request) -> jobs.JobRegistry:
+    return request.app.state.jobs
+
+
+def get_result_cache(request: Request) -> ResultCache:
+    return request.app.state.result_cache
+
+
+def get_solution_cache(request: Request) -> ResultCache:
+    return request.app.state.solution_cache
+
+
+def get_dataset_registry(request: Request) -> DatasetRegistry:
+    return request.app.state.datasets
+
+
+class SolverOptions(BaseModel):
+    """Query parameters choosing how scenario periods are modelled and solved."""
+
+    sparse: bool = False
+    solver: str = "glpk"
+    builder: str = "pyomo"
+    decompose: bool = False
+    presolve: bool = False
+    aggregate: bool = False
+    warm_start: bool = False
+
+
 def get_sqlite_session():
     return sqlite3.connect("./src/database/data.db")
 
@@ -35,16 +100,159 @@ def run_scenario(
     demand: str,
     prioritization_schema: str,
     file: Optional[bytes] = File(None),
+    options: SolverOptions = Depends(),
+    pool: services.SolverPool = Depends(get_solver_pool),
+    cache: ResultCache = Depends(get_result_cache),
+    solution_cache: ResultCache = Depends(get_solution_cache),
 ):
-    optimizer = services.build_optimizer(demand, prioritization_schema, file, strategy)
+    return services.run_scenario(
+        demand,
+        prioritization_schema,
+        file,
+        strategy,
+        pool,
+        cache,
+        solution_cache,
+        **options.dict(),
+    )
+
+
+@app.post("/datasets", status_code=status.HTTP_201_CREATED)
+def register_dataset(
+    file: bytes = File(...),
+    registry: DatasetRegistry = Depends(get_dataset_registry),
+):
+    return services.register_dataset(registry, file)
+
+
+@app.get("/datasets")
+def get_all_datasets(registry: DatasetRegistry = Depends(get_dataset_registry)):
+    return registry.list_datasets()
+
+
+@app.delete("/datasets/{dataset_id}")
+def delete_dataset(
+    dataset_id: str, registry: DatasetRegistry = Depends(get_dataset_registry)
+):
+    services.delete_dataset(registry, dataset_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@app.post(
+    "/datasets/{dataset_id}/scenarios/{strategy}", response_model=list[models.Sku]
+)
+def run_dataset_scenario(
+    dataset_id: str,
+    strategy: str,
+    demand: str,
+    prioritization_schema: str,
+    options: SolverOptions = Depends(),
+    registry: DatasetRegistry = Depends(get_dataset_registry),
+    pool: services.SolverPool = Depends(get_solver_pool),
+    cache: ResultCache = Depends(get_result_cache),
+    solution_cache: ResultCache = Depends(get_solution_cache),
+):
+    return services.run_dataset_scenario(
+        registry,
+        dataset_id,
+        demand,
+        prioritization_schema,
+        strategy,
+        pool,
+        cache,
+        solution_cache,
+        **options.dict(),
+    )
+
+
+@app.get("/cache/stats")
+def get_cache_stats(
+    cache: ResultCache = Depends(get_result_cache),
+    solution_cache: ResultCache = Depends(get_solution_cache),
+):
+    # period lookups run in the pool workers, whose counters this process
+    # never sees, so only the shared disk tier is reported for them
+    return {"results": cache.stats(), "periods": solution_cache.usage()}
+
+
+@app.post("/scenarios/{strategy}/json", response_model=list[models.Sku])
+def run_json_scenario(
+    strategy: str,
+    demand: str,
+    prioritization_schema: str,
+    tables: dict[str, list[dict]] = Body(...),
+    options: SolverOptions = Depends(),
+    pool: services.SolverPool = Depends(get_solver_pool),
+    solution_cache: ResultCache = Depends(get_solution_cache),
+):
+    return services.run_records_scenario(
+        tables,
+        demand,
+        prioritization_schema,
+        strategy,
+        pool,
+        solution_cache,
+        **options.dict(),
+    )
+
+
+@app.post("/scenarios/{strategy}/stream")
+def stream_scenario(
+    strategy: str,
+    demand: str,
+    prioritization_schema: str,
+    file: Optional[bytes] = File(None),
+    options: SolverOptions = Depends(),
+    pool: services.SolverPool = Depends(get_solver_pool),
+    solution_cache: ResultCache = Depends(get_solution_cache),
+):
+    optimizer = services.build_optimizer(
+        demand,
+        prioritization_schema,
+        file,
+        strategy,
+        **options.dict(),
+        solution_cache=solution_cache,
+    )
+
+    return StreamingResponse(
+        services.stream_allocations(optimizer, pool),
+        media_type="application/x-ndjson",
+    )
+
+
+@app.post("/jobs/{strategy}", status_code=status.HTTP_202_ACCEPTED)
+def submit_scenario(
+    strategy: str,
+    demand: str,
+    prioritization_schema: str,
+    file: Optional[bytes] = File(None),
+    options: SolverOptions = Depends(),
+    registry: jobs.JobRegistry = Depends(get_job_registry),
+    solution_cache: ResultCache = Depends(get_solution_cache),
+):
+    job = registry.submit(
+        strategy,
+        lambda: services.build_optimizer(
+            demand,
+            prioritization_schema,
+            file,
+            strategy,
+            **options.dict(),
+            solution_cache=solution_cache,
+        ),
+    )
+    return job.to_dict()
+
 
-    with multiprocessing.Pool() as pool:
-        results = pool.map(optimizer.optimize_period, optimizer.years)
+@app.get("/jobs/{job_id}")
+def get_job_status(job_id: str, registry: jobs.JobRegistry = Depends(get_job_registry)):
+    return registry.get(job_id).to_dict()
 
-    for result in results:
-        optimizer.allocated_skus.update(result)
 
-    return list(optimizer.allocated_skus)
+@app.get("/jobs/{job_id}/result", response_model=list[models.Sku])
+def get_job_result(job_id: str, registry: jobs.JobRegistry = Depends(get_job_registry)):
+    return registry.result(job_id)
 
 
 @app.put("/scenarios/{strategy}")
@@ -0,0 +1,131 @@
+"""Scenario runs submitted as background jobs and polled for progress."""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+import datetime as dt
+import logging
+import threading
+import uuid
+
+from fastapi import HTTPException, status
+from src.domain.optimizer import Optimizer, Period
+from src.domain.models import Sku
+from src.services import services
+
+logger = logging.getLogger(__name__)
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+
+class Job:
+    def __init__(self, strategy: str) -> None:
+        self.id = uuid.uuid4().hex
+        self.strategy = strategy
+        self.status = PENDING
+        self.periods: list[Period] = []
+        self.completed: list[Period] = []
+        self.skus: list[Sku] = []
+        self.error: Optional[str] = None
+        self.submitted = dt.datetime.now()
+        self.finished: Optional[dt.datetime] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "strategy": self.strategy,
+            "status": self.status,
+            "periods": len(self.periods),
+            "completed_periods": len(self.completed),
+            "completed": [list(period) for period in self.completed],
+            "error": self.error,
+            "submitted": self.submitted,
+            "finished": self.finished,
+        }
+
+
+class JobRegistry:
+    """Runs submitted scenarios on the shared solver pool and keeps their state.
+
+    A few threads drive the runs, each feeding one scenario's periods to the
+    pool. Only the ``max_jobs`` most recent jobs are kept; the oldest finished
+    ones are dropped first. A job fails once none of its periods has finished
+    for ``period_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        pool: services.SolverPool,
+        max_running: int = 2,
+        max_jobs: int = 100,
+        period_timeout: Optional[float] = None,
+    ):
+        self.pool = pool
+        self.period_timeout = period_timeout
+        self.max_jobs = max_jobs
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_running, thread_name_prefix="scenario-job"
+        )
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, strategy: str, build: Callable[[], Optimizer]) -> Job:
+        """Queue a run of the optimizer returned by ``build``."""
+        job = Job(strategy)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+        self.executor.submit(self._run, job, build)
+        return job
+
+    def get(self, job_id: str) -> Job:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Unknown job {job_id}.",
+            )
+        return job
+
+    def result(self, job_id: str) -> list[Sku]:
+        job = self.get(job_id)
+        if job.status != DONE:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Job {job_id} is {job.status}, its result is not available.",
+            )
+        return job.skus
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self, job: Job, build: Callable[[], Optimizer]) -> None:
+        job.status = RUNNING
+        try:
+            optimizer = build()
+            job.periods = optimizer.periods
+            for period, skus in services.iter_period_allocations(
+                optimizer, self.pool, self.period_timeout
+            ):
+                optimizer.allocated_skus.update(skus)
+                job.completed.append(period)
+            job.skus = list(optimizer.allocated_skus)
+            job.status = DONE
+        except HTTPException as error:
+            job.error = error.detail
+            job.status = FAILED
+        except Exception as error:
+            logger.exception("Scenario job %s failed", job.id)
+            job.error = str(error)
+            job.status = FAILED
+        finally:
+            job.finished = dt.datetime.now()
+
+    def _evict(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.is_finished]
+        while len(self._jobs) > self.max_jobs and finished:
+            del self._jobs[finished.pop(0)]
@@ -1,16 +1,301 @@
-from src.domain.optimizer import OptimizerBuilder
+from src.domain.optimizer import Optimizer, OptimizerBuilder, Period, SolutionCache
 from src.adapters.repository import AbstractRepository
+from src.adapters.cache import ResultCache
+from src.adapters.datasets import DatasetRegistry
+from src.domain.data_loaders import (
+    ApprovalsLoader,
+    AssetLoader,
+    LROPloader,
+    PrioritiesLoader,
+    RunRatesLoader,
+    validate_table_in_data,
+)
+from src.domain.ingestion import (
+    SCHEMA_SHEETS,
+    STRATEGIES,
+    known_sheets,
+    read_input,
+    read_records,
+    required_sheets,
+)
+from src.services import workers
 from src.domain.models import Sku
 from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from multiprocessing.pool import Pool
+import multiprocessing
+import logging
+import os
+import json
+import math
+
+logger = logging.getLogger(__name__)
+
+
+class SolverPool(Pool):
+    """Process pool that knows how many workers it runs."""
+
+    def __init__(self, processes: Optional[int] = None, **options) -> None:
+        self.size = processes or os.cpu_count() or 1
+        super().__init__(self.size, **options)
 
 
 def build_optimizer(
-    demand_scenario: str, prioritization_schema: str, file, strategy: str
+    demand_scenario: str, prioritization_schema: str, file, strategy: str, **options
 ) -> list[dict]:
 
     return OptimizerBuilder(
         demand_scenario, prioritization_schema, file
-    ).build_optimizer(strategy)
+    ).build_optimizer(strategy, **options)
+
+
+def run_scenario(
+    demand_scenario: str,
+    prioritization_schema: str,
+    file: Optional[bytes],
+    strategy: str,
+    pool: SolverPool,
+    cache: Optional[ResultCache] = None,
+    solution_cache: Optional[SolutionCache] = None,
+    **options,
+) -> list[Sku]:
+    """Solve a scenario, reusing the cached result of an identical earlier run.
+
+    The cache is looked up from the raw file bytes and request parameters, so
+    a hit skips reading the workbook as well as the solves. On a miss, periods
+    whose coefficients match an earlier solve are served from ``solution_cache``.
+    """
+    if cache is None:
+        optimizer = build_optimizer(
+            demand_scenario,
+            prioritization_schema,
+            file,
+            strategy,
+            solution_cache=solution_cache,
+            **options,
+        )
+        return run_optimizer(optimizer, pool)
+
+    key = cache.key(
+        file,
+        demand_scenario=demand_scenario,
+        prioritization_schema=prioritization_schema,
+        strategy=strategy,
+        **options,
+    )
+    skus = cache.get(key)
+    if skus is None:
+        skus = run_scenario(
+            demand_scenario,
+            prioritization_schema,
+            file,
+            strategy,
+            pool,
+            solution_cache=solution_cache,
+            **options,
+        )
+        cache.put(key, skus)
+    return skus
+
+
+def run_records_scenario(
+    tables: dict[str, list[dict]],
+    demand_scenario: str,
+    prioritization_schema: str,
+    strategy: str,
+    pool: SolverPool,
+    solution_cache: Optional[SolutionCache] = None,
+    **options,
+) -> list[Sku]:
+    """Solve a scenario whose input tables were sent as JSON records."""
+    data = read_records(tables, required_sheets(prioritization_schema))
+    optimizer = OptimizerBuilder.from_tables(
+        demand_scenario, prioritization_schema, data
+    ).build_optimizer(strategy, solution_cache=solution_cache, **options)
+    return run_optimizer(optimizer, pool)
+
+
+def register_dataset(registry: DatasetRegistry, file: bytes) -> dict:
+    """Parse and validate a workbook once and store its tables for later runs.
+
+    The approvals are checked for every strategy and the workbook is rejected
+    when they fit none; the priorities are checked for every schema sheet
+    present. The strategies that fit are kept in the dataset's metadata.
+    """
+    tables = read_input(file, known_sheets())
+    # the loaders below check the other sheets; Commitments is optional
+    for sheet in ("LROP", "Approvals"):
+        validate_table_in_data(sheet, tables)
+    demand_scenarios = sorted(
+        tables["LROP"]["Demand Scenario"].dropna().astype(str).unique()
+    )
+    years = set()
+    for demand_scenario in demand_scenarios:
+        years.update(LROPloader().load(demand_scenario, tables)[1])
+    years = sorted(years)
+    AssetLoader().load(tables)
+    RunRatesLoader().load(tables)
+
+    strategies = []
+    for strategy in STRATEGIES:
+        try:
+            ApprovalsLoader().load(tables, strategy, years)
+        except Exception as error:
+            logger.info("Approvals do not fit strategy %s: %r", strategy, error)
+        else:
+            strategies.append(strategy)
+    if not strategies:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Approvals do not fit any strategy: {', '.join(STRATEGIES)}.",
+        )
+    for schema in SCHEMA_SHEETS:
+        if all(sheet in tables for sheet in SCHEMA_SHEETS[schema]):
+            try:
+                PrioritiesLoader().load(tables, strategies[0], schema, years)
+            except HTTPException:
+                raise
+            except Exception as error:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"{schema} could not be loaded: {error!r}",
+                ) from None
+
+    dataset_id = registry.dataset_id(file)
+    registry.save(
+        dataset_id,
+        tables,
+        {"demand_scenarios": demand_scenarios, "strategies": strategies},
+    )
+    return registry.metadata(dataset_id)
+
+
+def delete_dataset(registry: DatasetRegistry, dataset_id: str) -> None:
+    with known_dataset(dataset_id):
+        registry.delete(dataset_id)
+
+
+@contextmanager
+def known_dataset(dataset_id: str) -> Iterator[None]:
+    """Report a dataset the registry does not know as a 404."""
+    try:
+        yield
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown dataset {dataset_id}.",
+        ) from None
+
+
+def run_dataset_scenario(
+    registry: DatasetRegistry,
+    dataset_id: str,
+    demand_scenario: str,
+    prioritization_schema: str,
+    strategy: str,
+    pool: SolverPool,
+    cache: Optional[ResultCache] = None,
+    solution_cache: Optional[SolutionCache] = None,
+    **options,
+) -> list[Sku]:
+    """Solve a scenario on the stored tables of a registered dataset."""
+    with known_dataset(dataset_id):
+        registry.metadata(dataset_id)  # unknown or deleted datasets are not served
+    key = ResultCache.key(
+        None,
+        dataset=dataset_id,
+        demand_scenario=demand_scenario,
+        prioritization_schema=prioritization_schema,
+        strategy=strategy,
+        **options,
+    )
+    skus = cache.get(key) if cache is not None else None
+    if skus is None:
+        with known_dataset(dataset_id):
+            tables = registry.load(dataset_id)
+        optimizer = OptimizerBuilder.from_tables(
+            demand_scenario, prioritization_schema, tables
+        ).build_optimizer(strategy, solution_cache=solution_cache, **options)
+        skus = run_optimizer(optimizer, pool)
+        if cache is not None:
+            cache.put(key, skus)
+    return skus
+
+
+def start_solver_pool(processes: Optional[int] = None) -> SolverPool:
+    """Long-lived pool of pre-warmed workers shared by every scenario run."""
+    return SolverPool(processes, initializer=workers.warm_up)
+
+
+def run_optimizer(
+    optimizer: Optimizer,
+    pool: Optional[SolverPool] = None,
+    processes: Optional[int] = None,
+) -> list[Sku]:
+    """Solve every period of ``optimizer`` in ``pool``.
+
+    Without a pool, a temporary one with ``processes`` workers is started.
+    """
+    if pool is None:
+        with start_solver_pool(processes) as pool:
+            return run_optimizer(optimizer, pool)
+
+    for _, skus in iter_period_allocations(optimizer, pool):
+        optimizer.allocated_skus.update(skus)
+
+    return list(optimizer.allocated_skus)
+
+
+def iter_period_allocations(
+    optimizer: Optimizer, pool: SolverPool, timeout: Optional[float] = None
+) -> Iterator[tuple[Period, set[Sku]]]:
+    """Yield each period with its allocation as soon as a worker finishes it.
+
+    With a ``timeout``, the run fails once no chunk of periods has finished for
+    that many seconds instead of waiting on the pool forever.
+    """
+    periods = optimizer.periods
+    # Contiguous chunks keep consecutive periods on the same worker while
+    # still leaving a few chunks per worker to balance uneven solve times.
+    # They are made here rather than by the pool's chunksize, whose iterator
+    # cannot wait with a timeout.
+    chunksize = max(1, math.ceil(len(periods) / (pool.size * 4)))
+    chunks = [
+        periods[start : start + chunksize]
+        for start in range(0, len(periods), chunksize)
+    ]
+
+    # Workers read the optimizer once from shared memory instead of receiving
+    # a pickled copy with every period, and send back compact allocation rows.
+    with workers.publish(optimizer) as handle:
+        results = pool.imap_unordered(
+            workers.allocate_task, [(handle, chunk) for chunk in chunks]
+        )
+        for _ in chunks:
+            try:
+                allocations = results.next(timeout)
+            except workers.PeriodError as error:
+                raise error.to_http() from None
+            except multiprocessing.TimeoutError:
+                raise HTTPException(
+                    status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                    detail=f"No period was solved within {timeout} seconds.",
+                ) from None
+            for period, rows in allocations:
+                yield period, optimizer.materialize_period(*period, rows)
+
+
+def stream_allocations(optimizer: Optimizer, pool: SolverPool) -> Iterator[str]:
+    """Newline-delimited JSON, one line per period as soon as it is solved.
+
+    Each line holds the period and its allocated skus, encoded as in the
+    ``list[Sku]`` response of a blocking run.
+    """
+    for (year, month), skus in iter_period_allocations(optimizer, pool):
+        line = {"year": year, "month": month, "skus": jsonable_encoder(list(skus))}
+        yield json.dumps(line) + "\n"
 
 
 def save_scenario(
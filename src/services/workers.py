@@ -0,0 +1,115 @@
+"""Worker-side state for solving periods in a process pool.
+
+The optimizer is pickled once into shared memory by ``publish`` and each worker
+unpickles it on first use, so tasks only carry a handle and a period key.
+"""
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Iterator, Optional
+import importlib
+import logging
+import pickle
+
+from fastapi import HTTPException, status
+from src.domain.optimizer import AllocationRow, Optimizer, Period
+
+logger = logging.getLogger(__name__)
+
+# (shared memory block name, pickled size)
+Handle = tuple[str, int]
+
+# Optimizers a worker keeps unpickled, most recently used last.
+CACHE_SIZE = 2
+_optimizers: OrderedDict[str, Optimizer] = OrderedDict()
+
+# Imported up front by ``warm_up`` so the first solve in a worker does not pay for them.
+WARM_MODULES = (
+    "numpy",
+    "pandas",
+    "pyomo.environ",
+    "src.domain.optimizer",
+    "src.domain.solvers",
+    "src.domain.linear_program",
+)
+
+
+def warm_up() -> None:
+    """Pool initializer importing the solver stack in a fresh worker."""
+    for module in WARM_MODULES:
+        importlib.import_module(module)
+
+
+@contextmanager
+def publish(optimizer: Optimizer) -> Iterator[Handle]:
+    payload = pickle.dumps(optimizer, protocol=pickle.HIGHEST_PROTOCOL)
+    block = shared_memory.SharedMemory(create=True, size=max(len(payload), 1))
+    try:
+        block.buf[: len(payload)] = payload
+        yield block.name, len(payload)
+    finally:
+        block.close()
+        block.unlink()
+
+
+def load(handle: Handle) -> Optimizer:
+    name, size = handle
+    if name in _optimizers:
+        _optimizers.move_to_end(name)
+        return _optimizers[name]
+
+    block = shared_memory.SharedMemory(name=name)
+    # Attaching registers the block with the resource tracker as if this process
+    # owned it; only the publishing process may unlink it.
+    resource_tracker.unregister(block._name, "shared_memory")
+    try:
+        optimizer = pickle.loads(block.buf[:size])
+    finally:
+        block.close()
+    _optimizers[name] = optimizer
+    while len(_optimizers) > CACHE_SIZE:
+        _optimizers.popitem(last=False)
+    return optimizer
+
+
+def allocate_period(
+    handle: Handle, year: int, month: Optional[int] = None
+) -> list[AllocationRow]:
+    return load(handle).allocate_period(year, month)
+
+
+class PeriodError(Exception):
+    """A period that failed in a worker, as status and detail of an HTTP error.
+
+    ``HTTPException`` does not survive the trip back to the parent: unpickling
+    it fails in the pool's result handler, which then stops serving every run.
+    """
+
+    def __init__(self, status_code: int, detail) -> None:
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+    def to_http(self) -> HTTPException:
+        return HTTPException(status_code=self.status_code, detail=self.detail)
+
+
+def allocate_task(
+    task: tuple[Handle, list[Period]],
+) -> list[tuple[Period, list[AllocationRow]]]:
+    """Allocate a chunk of periods, the unit of work sent through the pool."""
+    handle, periods = task
+    allocations = []
+    for period in periods:
+        try:
+            allocations.append((period, allocate_period(handle, *period)))
+        except HTTPException as error:
+            raise PeriodError(error.status_code, error.detail) from None
+        except Exception as error:
+            logger.exception("Period %s failed", period)
+            raise PeriodError(
+                status.HTTP_500_INTERNAL_SERVER_ERROR,
+                f"Period {period} failed: {error!r}",
+            ) from None
+    return allocations
@@ -1,4 +1,5 @@
 from src.domain.approvals import VpackApprovals, VFNApprovals
+from src.domain.models import Sku, sku_frame
 import datetime as dt
 
 
@@ -78,3 +79,52 @@ def test_vfn_approvals_return_false(sku, asset):
     )
 
     assert approvals.get_approval(sku, asset) is False
+
+
+def test_vfn_approval_matrix_uses_first_matching_key(sku_values, asset):
+    approvals = VFNApprovals(
+        {
+            ("Haarlem-V11", "LA", "SYRINGE", "Gardasil 9", "Peru"): (
+                dt.datetime(year=2025, month=1, day=1),
+                dt.datetime(year=2031, month=1, day=1),
+            ),
+            ("Haarlem-V11", "All", "SYRINGE", "Gardasil 9", "All"): (
+                dt.datetime(year=2022, month=1, day=1),
+                dt.datetime(year=2031, month=1, day=1),
+            ),
+        }
+    )
+
+    skus = [Sku(**sku_values)]
+    sku_values["market"] = "Chile"
+    skus.append(Sku(**sku_values))
+    sku_values["image"] = "VIAL"
+    skus.append(Sku(**sku_values))
+
+    matrix = approvals.get_approval_matrix(sku_frame(skus), [asset])
+
+    assert list(matrix[:, 0]) == [False, True, False]
+    assert list(matrix[:, 0]) == [approvals.get_approval(sku, asset) for sku in skus]
+
+
+def test_vfn_approvals_compile_once_per_combination(sku_values, asset):
+    approvals = VFNApprovals(
+        {
+            ("Haarlem-V11", "LA", "SYRINGE", "Gardasil 9", "All"): (
+                dt.datetime(year=2022, month=1, day=1),
+                dt.datetime(year=2031, month=1, day=1),
+            ),
+        }
+    )
+    skus = [Sku(**sku_values)]
+    sku_values["region"] = "US"
+    skus.append(Sku(**sku_values))
+
+    compiled = approvals.compile(sku_frame(skus + skus))
+    coverage = approvals.coverage()
+
+    assert list(compiled["region"]) == ["LA"]
+    assert list(compiled["asset"]) == ["Haarlem-V11"]
+    assert list(coverage["region"]) == ["LA", "US"]
+    assert list(coverage["assets"]) == [1, 0]
+    assert approvals.compile(sku_frame(skus)) is compiled
@@ -0,0 +1,53 @@
+from src.adapters.cache import ResultCache
+import os
+
+
+def test_key_depends_on_bytes_and_parameters():
+    key = ResultCache.key(b"workbook", strategy="vpack", sparse=False)
+
+    assert key == ResultCache.key(b"workbook", sparse=False, strategy="vpack")
+    assert key != ResultCache.key(b"workbook!", strategy="vpack", sparse=False)
+    assert key != ResultCache.key(b"workbook", strategy="vfn", sparse=False)
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResultCache(memory_items=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["memory_hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_disk_tier_survives_memory_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path), memory_items=1)
+    cache.put("a", [1, 2])
+    cache.put("b", [3])
+
+    assert cache.get("a") == [1, 2]
+    assert cache.stats()["disk_hits"] == 1
+    assert ResultCache(str(tmp_path)).get("b") == [3]
+
+
+def test_disk_tier_evicts_oldest_files_over_budget(tmp_path):
+    cache = ResultCache(str(tmp_path), memory_items=0, disk_bytes=300)
+    cache.put("old", b"x" * 200)
+    os.utime(tmp_path / "old.pkl", (0, 0))
+    cache.put("new", b"y" * 200)
+
+    assert cache.get("old") is None
+    assert cache.get("new") == b"y" * 200
+    assert cache.stats()["disk_items"] == 1
+
+
+def test_usage_counts_files_written_by_other_instances(tmp_path):
+    ResultCache(str(tmp_path)).put("a", b"x" * 100)
+
+    usage = ResultCache(str(tmp_path)).usage()
+
+    assert usage["disk_items"] == 1
+    assert usage["disk_bytes"] > 100
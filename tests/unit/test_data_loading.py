@@ -1,4 +1,7 @@
+import io
+import json
 import os
+import zipfile
 import datetime as dt
 import pandas as pd
 import pytest
@@ -9,6 +12,13 @@ from src.domain.data_loaders import (
     PrioritiesLoader,
     RunRatesLoader,
 )
+from src.domain.ingestion import (
+    is_bundle,
+    read_input,
+    read_records,
+    read_workbook,
+    required_sheets,
+)
 from src.domain.models import Sku
 from src.domain.priorities import GeneralPriorities, VariableCosts
 
@@ -105,3 +115,53 @@ def test_run_rates_load(sku, asset):
     run_rates = RunRatesLoader().load(data)
 
     assert run_rates.get_utilization(sku, asset, 1.0) == pytest.approx(0.0035, rel=0.1)
+
+
+def test_required_sheets_depend_on_schema():
+    assert "Commitments" in required_sheets("General Priorities")
+    assert "Variable Costs" not in required_sheets("General Priorities")
+    assert "Variable Costs" in required_sheets("Variable Costs")
+
+
+def test_read_workbook_parses_only_requested_sheets():
+    with open(path_to_standard_input, "rb") as file:
+        selected = read_workbook(file.read(), ["LROP", "Run Rates", "Commitments"])
+
+    assert list(selected) == ["LROP", "Run Rates"]
+    pd.testing.assert_frame_equal(selected["LROP"], data["LROP"])
+
+
+@pytest.mark.parametrize("extension", ["csv", "parquet"])
+def test_bundle_reads_like_workbook(extension):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as bundle:
+        for sheet, table in data.items():
+            buffer = io.BytesIO()
+            if extension == "csv":
+                table.to_csv(buffer, index=False)
+            else:
+                table.rename(columns=str).to_parquet(buffer, index=False)
+            bundle.writestr(f"inputs/{sheet}.{extension}", buffer.getvalue())
+    with open(path_to_standard_input, "rb") as file:
+        workbook = file.read()
+
+    assert is_bundle(archive.getvalue()) and not is_bundle(workbook)
+    bundled = read_input(archive.getvalue(), ["LROP", "Capacities", "Commitments"])
+
+    assert list(bundled) == ["LROP", "Capacities"]
+    pd.testing.assert_frame_equal(
+        LROPloader().load("B", bundled)[0], LROPloader().load("B", data)[0]
+    )
+    assert AssetLoader().load(bundled) == AssetLoader().load(data)
+
+
+def test_records_read_like_workbook():
+    records = {
+        sheet: json.loads(table.to_json(orient="records"))
+        for sheet, table in data.items()
+    }
+
+    tables = read_records(records, ["Run Rates", "Capacities"])
+
+    assert RunRatesLoader().load(tables) == RunRatesLoader().load(data)
+    assert AssetLoader().load(tables) == AssetLoader().load(data)
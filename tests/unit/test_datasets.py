@@ -0,0 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from src.adapters.datasets import DatasetRegistry
+from src.domain.ingestion import known_sheets, read_workbook
+from src.domain.optimizer import OptimizerBuilder
+from src.services import services
+import io
+import pandas as pd
+import pytest
+import zipfile
+
+path_to_standard_input = "./src/inputs/testing.xlsx"
+
+
+@pytest.fixture
+def workbook():
+    with open(path_to_standard_input, "rb") as file:
+        return file.read()
+
+
+def test_registered_tables_round_trip(tmp_path, workbook):
+    registry = DatasetRegistry(str(tmp_path))
+
+    metadata = services.register_dataset(registry, workbook)
+
+    assert metadata["dataset_id"] == registry.dataset_id(workbook)
+    assert metadata["demand_scenarios"] == ["B"]
+    assert metadata["strategies"] == ["vpack"]
+    assert registry.list_datasets() == [metadata]
+    tables = registry.load(metadata["dataset_id"])
+    for sheet, table in read_workbook(workbook, known_sheets()).items():
+        pd.testing.assert_frame_equal(tables[sheet], table)
+
+
+def test_registered_dataset_builds_same_optimizer(tmp_path, workbook):
+    registry = DatasetRegistry(str(tmp_path))
+    dataset_id = services.register_dataset(registry, workbook)["dataset_id"]
+
+    stored = OptimizerBuilder.from_tables(
+        "B", "General Priorities", registry.load(dataset_id)
+    ).build_optimizer("vpack")
+    uploaded = OptimizerBuilder(
+        "B", "General Priorities", path_to_standard_input
+    ).build_optimizer("vpack")
+
+    assert set(stored.demand.data) == set(uploaded.demand.data)
+    assert stored.periods == uploaded.periods
+
+
+def test_deleted_dataset_is_unknown(tmp_path, workbook):
+    registry = DatasetRegistry(str(tmp_path))
+    dataset_id = services.register_dataset(registry, workbook)["dataset_id"]
+
+    registry.delete(dataset_id)
+
+    with pytest.raises(KeyError):
+        registry.load(dataset_id)
+    with pytest.raises(HTTPException) as error:
+        services.run_dataset_scenario(
+            registry, dataset_id, "B", "General Priorities", "vpack", None
+        )
+    assert error.value.status_code == 404
+    with pytest.raises(HTTPException) as error:
+        services.delete_dataset(registry, dataset_id)
+    assert error.value.status_code == 404
+
+
+def test_concurrent_registrations_of_a_workbook(tmp_path, workbook):
+    registry = DatasetRegistry(str(tmp_path))
+    tables = read_workbook(workbook, known_sheets())
+    dataset_id = registry.dataset_id(workbook)
+
+    with ThreadPoolExecutor(4) as executor:
+        saves = [
+            executor.submit(registry.save, dataset_id, tables, {}) for _ in range(8)
+        ]
+    for save in saves:
+        save.result()
+
+    assert [entry.name for entry in tmp_path.iterdir()] == [dataset_id]
+    pd.testing.assert_frame_equal(registry.load(dataset_id)["LROP"], tables["LROP"])
+
+
+def bundle(tables: dict[str, pd.DataFrame]) -> bytes:
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as file:
+        for sheet, table in tables.items():
+            file.writestr(f"{sheet}.csv", table.to_csv(index=False))
+    return archive.getvalue()
+
+
+@pytest.mark.parametrize(
+    "sheet, column, detail",
+    [
+        ("Approvals", "Config", "Approvals do not fit any strategy"),
+        ("General Priorities", "Asset", "General Priorities could not be loaded"),
+    ],
+)
+def test_dataset_with_invalid_sheet_is_rejected(
+    tmp_path, workbook, sheet, column, detail
+):
+    registry = DatasetRegistry(str(tmp_path))
+    tables = read_workbook(workbook, known_sheets())
+    tables[sheet] = tables[sheet].drop(columns=column)
+
+    with pytest.raises(HTTPException) as error:
+        services.register_dataset(registry, bundle(tables))
+
+    assert error.value.status_code == 400
+    assert error.value.detail.startswith(detail)
+    assert registry.list_datasets() == []
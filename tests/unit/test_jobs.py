@@ -0,0 +1,96 @@
+from fastapi import HTTPException
+from src.domain.models import Asset
+from src.domain.optimizer import OptimizerBuilder
+from src.services import jobs, services
+import datetime as dt
+import pytest
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with services.start_solver_pool(2) as pool:
+        yield pool
+
+
+def build_vpack():
+    return OptimizerBuilder(
+        "B", "General Priorities", "./src/inputs/testing.xlsx"
+    ).build_optimizer("vpack")
+
+
+def test_job_reports_progress_and_result(pool):
+    registry = jobs.JobRegistry(pool)
+
+    job = registry.submit("vpack", build_vpack)
+    registry.shutdown()
+
+    status = registry.get(job.id).to_dict()
+    assert status["status"] == jobs.DONE
+    assert status["periods"] == status["completed_periods"] == 1
+    assert sum(sku.doses for sku in registry.result(job.id)) == 18200
+
+
+def test_failed_job_has_no_result(pool):
+    registry = jobs.JobRegistry(pool)
+
+    def build():
+        raise HTTPException(status_code=400, detail="bad input")
+
+    job = registry.submit("vpack", build)
+    registry.shutdown()
+
+    assert job.status == jobs.FAILED
+    assert job.error == "bad input"
+    with pytest.raises(HTTPException) as error:
+        registry.result(job.id)
+    assert error.value.status_code == 409
+
+
+def test_job_fails_on_a_failed_period(pool):
+    registry = jobs.JobRegistry(pool)
+
+    def build():
+        optimizer = build_vpack()
+        # a take or pay commitment on an asset without any approved sku
+        optimizer.applying_take_or_pay = True
+        optimizer.assets = {
+            *optimizer.assets,
+            Asset(
+                "Unapproved",
+                "1014",
+                "W40V10_1014_008",
+                "Internal",
+                "VIAL",
+                dt.datetime(2022, 1, 1),
+                {2030: 5760},
+                {2030: 50},
+            ),
+        }
+        return optimizer
+
+    job = registry.submit("vpack", build)
+    registry.shutdown()
+
+    assert job.status == jobs.FAILED
+    assert "did not Converge" in job.error
+
+    registry = jobs.JobRegistry(pool)
+    job = registry.submit("vpack", build_vpack)
+    registry.shutdown()
+    assert job.status == jobs.DONE
+
+
+def test_job_times_out_waiting_for_periods(pool):
+    registry = jobs.JobRegistry(pool, period_timeout=1e-6)
+
+    job = registry.submit("vpack", build_vpack)
+    registry.shutdown()
+
+    assert job.status == jobs.FAILED
+    assert "within" in job.error
+
+
+def test_unknown_job(pool):
+    with pytest.raises(HTTPException) as error:
+        jobs.JobRegistry(pool).get("missing")
+    assert error.value.status_code == 404
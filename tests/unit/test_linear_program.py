@@ -0,0 +1,77 @@
+from src.domain.linear_program import (
+    LinearProgram,
+    aggregate,
+    connected_components,
+    presolve,
+)
+import numpy as np
+
+
+def test_linear_program_rows_and_columns():
+    priorities = np.array([[1.0, -10.0, 2.0], [3.0, 1.0, -10.0]])
+    utilization = np.array([[0.5, 1.0, 0.8], [0.7, 0.2, 1.0]])
+
+    program = LinearProgram.build(
+        priorities, utilization, np.array([100.0, 200.0]), np.array([0.0, 0.0, 50.0])
+    )
+
+    assert program.num_cols == 4
+    assert list(program.cost) == [1.0, 2.0, 3.0, 1.0]
+    # two sku rows, three asset capacity rows and one take or pay row
+    assert program.num_rows == 6
+    assert list(program.indptr) == [0, 2, 4, 6, 7, 8, 9]
+    assert list(program.row_lower[-1:]) == [50.0]
+    assert list(program.to_allocation(np.ones(4))[:, 1]) == [0.0, 1.0]
+
+
+def test_connected_components_split_independent_skus_and_assets():
+    allowed = np.array(
+        [
+            [True, False, False, False],
+            [True, True, False, False],
+            [False, False, True, False],
+            [False, False, False, False],
+        ]
+    )
+
+    sku_labels, asset_labels = connected_components(allowed)
+
+    assert list(sku_labels) == [0, 0, 2, -1]
+    assert list(asset_labels) == [0, 0, 2, -1]
+
+
+def test_presolve_settles_unservable_idle_and_isolated_pairs():
+    priorities = np.array(
+        [
+            [1.0, 2.0, -10.0, -10.0],
+            [3.0, -10.0, -10.0, -10.0],
+            [-10.0, -10.0, 4.0, -10.0],
+            [-10.0, -10.0, -10.0, -10.0],
+        ]
+    )
+    utilization = np.full(priorities.shape, 2.0)
+
+    presolved = presolve(priorities, utilization, np.full(4, 100.0), np.zeros(4))
+
+    assert list(presolved.skus) == [0, 1]
+    assert list(presolved.assets) == [0, 1]
+    assert presolved.values[2, 2] == 0.5
+    assert presolved.values.sum() == 0.5
+    assert presolved.stats()["unservable_skus"] == 1
+    assert presolved.stats()["idle_assets"] == 1
+    assert presolved.stats()["fixed"] == 1
+
+
+def test_aggregate_merges_identical_columns():
+    priorities = np.array([[1.0, -10.0], [2.0, 3.0], [1.0, -10.0], [1.0, -10.0]])
+    utilization = np.array([[0.1, 0.2], [0.3, 0.4], [0.1, 0.2], [0.1, 0.2]])
+    doses = np.array([10.0, 20.0, 10.0, 30.0])
+
+    groups, merged_priorities, merged_utilization, merged_doses = aggregate(
+        priorities, utilization, doses
+    )
+
+    assert list(groups) == [0, 2, 0, 1]
+    assert merged_priorities.tolist() == [[2.0, -20.0], [1.0, -10.0], [2.0, 3.0]]
+    assert merged_utilization.tolist() == [[0.2, 0.4], [0.1, 0.2], [0.3, 0.4]]
+    assert list(merged_doses) == [20.0, 30.0, 20.0]
@@ -1,10 +1,21 @@
 from src.domain.relational_data import RunRates
 from src.domain.approvals import VpackApprovals
 from src.domain.priorities import GeneralPriorities, PriorityProvider
-from src.domain.optimizer import OptimizerBuilder
-from src.domain.models import Sku, Asset
+from src.domain.optimizer import Optimizer, OptimizerBuilder
+from src.domain.models import Demand, Sku, Asset
+import src.services.services as services
+from src.services import workers
+from src.domain.linear_program import LinearProgram
+from src.domain.solvers import get_solver
+from src.adapters.cache import ResultCache
+import numpy as np
+from fastapi import HTTPException
 import pytest
+import pandas as pd
+from operator import attrgetter
+import dataclasses
 import datetime as dt
+import json
 
 approvals = VpackApprovals(
     {
@@ -33,6 +44,16 @@ unmet_demand = Asset(
     {},
 )
 
+unapproved_asset = Asset(
+    "Haarlem-V10",
+    "1014",
+    "W40V10_1014_008",
+    "Internal",
+    "SYRINGE",
+    dt.datetime(year=2022, month=1, day=1),
+    {2022: 5760},
+)
+
 
 def test_vpack_optimization(asset, sku):
     optimizer = OptimizerBuilder(
@@ -102,5 +123,294 @@ def test_vpack_optimization(asset, sku):
         )
 
 
+def optimize(skus, assets, options=None, schema=priorities, rates=run_rates):
+    """Solve 2022 for ``skus`` on ``assets`` with an optimizer built with ``options``."""
+    optimizer = OptimizerBuilder(
+        "B", "General Priorities", "./src/inputs/testing.xlsx"
+    ).build_optimizer("vpack", **(options or {}))
+    optimizer.demand.data = set(skus)
+    optimizer.priorities = schema
+    optimizer.run_rates = rates
+    optimizer.assets = set(assets)
+    return optimizer, optimizer.optimize_period(2022)
+
+
+def allocation(skus):
+    return sorted(
+        (
+            s.material_number,
+            s.allocated_to.name,
+            s.doses,
+            pytest.approx(s.percent_utilization),
+        )
+        for s in skus
+    )
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"sparse": True},
+        {"solver": "highs"},
+        {"solver": "highs", "builder": "matrix"},
+        {"solver": "highs", "builder": "matrix", "warm_start": True},
+    ],
+)
+def test_solver_options_match_default(asset, sku, options):
+    _, expected = optimize({sku}, {asset, unapproved_asset})
+    optimizer, skus = optimize({sku}, {asset, unapproved_asset}, options)
+
+    assert allocation(skus) == allocation(expected)
+    assert allocation(skus)[0][1:3] == ("Haarlem-V11", 28757)
+    assert (2022, None) in optimizer.solve_times
+
+
+def test_sparse_model_skips_unapproved_pairs(asset, sku):
+    optimizer, _ = optimize({sku}, {asset, unapproved_asset}, {"sparse": True})
+
+    assert optimizer.solved_model.nvariables() == 1
+    assert not hasattr(optimizer.solved_model, "siting_constraint")
+
+
+@pytest.mark.parametrize("reload_share", [0.0, 1.0])
+def test_persistent_highs_solver_reuses_loaded_program(reload_share):
+    solver = get_solver("highs", persistent=True)
+    # passes changed programs again, or changes their coefficients in place
+    solver.RELOAD_SHARE = reload_share
+    programs = [
+        LinearProgram.build(
+            np.array([[1.0, -10.0], [2.0, 1.0]]),
+            np.array([[0.5, 1.0], [utilization, 0.4]]),
+            np.array([100.0, 200.0]),
+            np.array([0.0, min_capacity]),
+        )
+        for utilization, min_capacity in ((0.8, 50.0), (2.0, 150.0))
+    ]
+
+    for program in programs:
+        warm = solver.solve_matrix(program)
+        cold = get_solver("highs").solve_matrix(program)
+        assert warm == pytest.approx(cold)
+
+    assert len(solver._models) == 1
+
+
+def test_glpk_rejects_matrix_programs(asset, sku):
+    program = LinearProgram.build(
+        np.array([[1.0]]), np.array([[0.5]]), np.array([100.0]), np.array([0.0])
+    )
+
+    with pytest.raises(HTTPException) as direct:
+        get_solver("glpk").solve_matrix(program)
+    with pytest.raises(HTTPException) as option:
+        optimize({sku}, {asset}, {"builder": "matrix"})
+
+    assert direct.value.status_code == option.value.status_code == 400
+    assert direct.value.detail == option.value.detail
+
+
+@pytest.mark.parametrize("options", [{"decompose": True}, {"presolve": True}])
+def test_reduced_optimization_matches_monolithic(asset, sku_values, options):
+    vial_sku = Sku(**{**sku_values, "image": "VIAL", "material_number": "2"})
+    skus = {Sku(**sku_values), vial_sku}
+    vial_asset = Asset(
+        "Haarlem-V10",
+        "1014",
+        "W40V10_1014_008",
+        "Internal",
+        "VIAL",
+        dt.datetime(year=2022, month=1, day=1),
+        {2022: 5760},
+    )
+    vial_approvals = VpackApprovals(
+        {
+            **approvals,
+            ("Haarlem-V10", "LA", "VIAL", "10x", "All"): (
+                dt.datetime(year=2022, month=1, day=1),
+                dt.datetime(year=2031, month=1, day=1),
+            ),
+        }
+    )
+    scenario = {
+        "schema": PriorityProvider(
+            GeneralPriorities({**priority_schema, "Haarlem-V10": 1}), vial_approvals
+        ),
+        "rates": RunRates({**run_rates, ("Haarlem-V10", "VIAL", "10x"): (2, 1)}),
+    }
+
+    _, expected = optimize(skus, {asset, vial_asset}, **scenario)
+    _, reduced = optimize(skus, {asset, vial_asset}, options, **scenario)
+
+    assert allocation(reduced) == allocation(expected)
+    assert ("2", "Haarlem-V10", 11515) in [a[:3] for a in allocation(reduced)]
+
+
+@pytest.mark.parametrize("doses", [50000, 20000])
+def test_aggregated_optimization_matches_monolithic(asset, sku_values, doses):
+    skus = {
+        Sku(**sku_values),
+        Sku(**{**sku_values, "material_number": "2", "market": "Chile"}),
+        Sku(**{**sku_values, "material_number": "3", "doses": doses}),
+    }
+    demand = {sku.material_number: sku.doses for sku in skus}
+
+    def served(allocated):
+        # the objective, as every sku has the same priority on the asset
+        return sum(
+            s.doses / demand[s.material_number]
+            for s in allocated
+            if s.allocated_to.name == asset.name
+        )
+
+    _, expected = optimize(skus, {asset})
+    _, aggregated = optimize(skus, {asset}, {"aggregate": True})
+
+    assert served(aggregated) == pytest.approx(served(expected), rel=1e-4)
+    assert served(expected) > 0
+
+
+def test_vfn_optimizer_fans_out_monthly_periods(asset, sku):
+    lrop = pd.DataFrame([(2022, *sku.to_tuple()[1:11])])
+    optimizer = Optimizer(
+        {asset},
+        Demand(lrop, monthize_capacity=True),
+        priorities,
+        run_rates,
+        [2022],
+        applying_take_or_pay=True,
+    )
+
+    assert optimizer.periods == [(2022, month) for month in range(1, 13)]
+
+
+def test_pool_chunks_more_periods_than_workers(asset, sku):
+    lrop = pd.DataFrame([(2022, *sku.to_tuple()[1:11])])
+    optimizer = Optimizer(
+        {asset},
+        Demand(lrop, monthize_capacity=True),
+        priorities,
+        run_rates,
+        [2022],
+    )
+
+    with services.start_solver_pool(2) as pool:
+        allocations = dict(
+            services.iter_period_allocations(optimizer, pool, timeout=60)
+        )
+
+    assert sorted(allocations) == optimizer.periods
+    assert len(optimizer.periods) > 4 * pool.size
+
+
+def test_run_optimizer_merges_every_period():
+    optimizer = OptimizerBuilder(
+        "B", "General Priorities", "./src/inputs/testing.xlsx"
+    ).build_optimizer("vpack")
+
+    skus = services.run_optimizer(optimizer, processes=2)
+
+    assert optimizer.periods == [(2030, None)]
+    assert sum(sku.doses for sku in skus) == 18200
+
+
+def test_solver_pool_is_shared_between_runs():
+    optimizer = OptimizerBuilder(
+        "B", "General Priorities", "./src/inputs/testing.xlsx"
+    ).build_optimizer("vpack")
+
+    with services.start_solver_pool(2) as pool:
+        first = services.run_optimizer(optimizer, pool)
+        second = services.run_optimizer(optimizer, pool)
+
+    assert set(first) == set(second)
+    assert sum(sku.doses for sku in first) == 18200
+
+
+def test_failed_period_does_not_break_the_pool():
+    infeasible = OptimizerBuilder(
+        "B", "General Priorities", "./src/inputs/testing.xlsx"
+    ).build_optimizer("vpack")
+    # a take or pay commitment on an asset without any approved sku
+    infeasible.applying_take_or_pay = True
+    infeasible.assets = {
+        *infeasible.assets,
+        dataclasses.replace(
+            unapproved_asset, name="Unapproved", min_capacities={2030: 50}
+        ),
+    }
+    optimizer = OptimizerBuilder(
+        "B", "General Priorities", "./src/inputs/testing.xlsx"
+    ).build_optimizer("vpack")
+
+    with services.start_solver_pool(2) as pool:
+        with pytest.raises(HTTPException) as error:
+            services.run_optimizer(infeasible, pool)
+        skus = services.run_optimizer(optimizer, pool)
+
+    assert error.value.status_code == 400
+    assert sum(sku.doses for sku in skus) == 18200
+
+
+def test_run_scenario_reuses_cached_result():
+    cache = ResultCache()
+    with open("./src/inputs/testing.xlsx", "rb") as file:
+        workbook = file.read()
+
+    with services.start_solver_pool(2) as pool:
+        first = services.run_scenario(
+            "B", "General Priorities", workbook, "vpack", pool, cache
+        )
+        second = services.run_scenario(
+            "B", "General Priorities", workbook, "vpack", pool, cache
+        )
+
+    assert second is first
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 1
+
+
+def test_unchanged_period_is_not_solved_again():
+    cache = ResultCache()
+    optimizer = OptimizerBuilder(
+        "B", "General Priorities", "./src/inputs/testing.xlsx"
+    ).build_optimizer("vpack", solution_cache=cache)
+    solved = optimizer.optimize_period(2030)
+
+    def solve_period(*args):
+        raise AssertionError("period was solved again")
+
+    optimizer._solve_period = solve_period
+    assert optimizer.optimize_period(2030) == solved
+    assert cache.stats()["hits"] == 1
+
+
+def test_stream_allocations_writes_one_line_per_period():
+    optimizer = OptimizerBuilder(
+        "B", "General Priorities", "./src/inputs/testing.xlsx"
+    ).build_optimizer("vpack")
+
+    with services.start_solver_pool(2) as pool:
+        lines = [
+            json.loads(line) for line in services.stream_allocations(optimizer, pool)
+        ]
+
+    assert [(line["year"], line["month"]) for line in lines] == [(2030, None)]
+    assert sum(sku["doses"] for sku in lines[0]["skus"]) == 18200
+
+
+def test_worker_rows_materialize_to_period_allocation():
+    optimizer = OptimizerBuilder(
+        "B", "General Priorities", "./src/inputs/testing.xlsx"
+    ).build_optimizer("vpack")
+
+    with workers.publish(optimizer) as handle:
+        rows = workers.allocate_period(handle, 2030)
+        assert workers.load(handle) is workers.load(handle)
+
+    assert all(isinstance(i, int) for i, *_ in rows)
+    assert optimizer.materialize_period(2030, None, rows) == (
+        optimizer.optimize_period(2030)
+    )
+
+
 def test_vfn_optimization():
     pass
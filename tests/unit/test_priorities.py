@@ -1,5 +1,6 @@
 from src.domain.approvals import VpackApprovals
 from src.domain.priorities import GeneralPriorities, PriorityProvider
+from src.domain.models import Sku, sku_frame
 import datetime as dt
 
 
@@ -30,3 +31,30 @@ def test_priorities_calculates_correctly(sku, asset):
     priorities = PriorityProvider(prioritization_schema, approvals)
 
     assert priorities.get_priority(sku, asset) == 7.9
+
+
+def test_priority_matrix_matches_pairwise_priorities(sku_values, asset):
+    approvals = VpackApprovals(
+        {
+            ("Haarlem-V11", "LA", "SYRINGE", "10x", "All"): (
+                dt.datetime(year=2020, month=1, day=1),
+                dt.datetime(year=2031, month=1, day=1),
+            )
+        }
+    )
+
+    prioritization_schema = GeneralPriorities(
+        {"Haarlem-V11": 1, ("Haarlem-V11", "10x"): 10, ("Haarlem-V11", "LA"): 3},
+    )
+
+    priorities = PriorityProvider(prioritization_schema, approvals)
+
+    skus = [Sku(**sku_values)]
+    sku_values["config"] = "1x"
+    skus.append(Sku(**sku_values))
+
+    matrix = priorities.get_priority_matrix(sku_frame(skus), [asset])
+
+    assert matrix.shape == (2, 1)
+    assert list(matrix[:, 0]) == [priorities.get_priority(sku, asset) for sku in skus]
+    assert list(matrix[:, 0]) == [8.1, -10]
@@ -1,5 +1,5 @@
 from src.domain.relational_data import RunRates
-from src.domain.models import Asset
+from src.domain.models import Asset, Sku, sku_frame
 import pytest
 import datetime as dt
 
@@ -29,3 +29,20 @@ def test_undefined_rate_returns_large_number(sku):
     utilization = run_rates.get_utilization(sku, asset, 1)
 
     assert utilization == 1000000
+
+
+def test_utilization_matrix_masks_undefined_rates(sku_values, asset):
+    run_rates = RunRates({("Haarlem-V11", "SYRINGE", "10x"): (9720, 1.5)})
+
+    skus = [Sku(**sku_values)]
+    sku_values["config"] = "1x"
+    skus.append(Sku(**sku_values))
+    sku_values["config"] = "10x"
+    sku_values["date"] = dt.datetime(2031, 1, 1)
+    skus.append(Sku(**sku_values))
+
+    utilization = run_rates.get_utilization_matrix(sku_frame(skus), [asset])
+
+    assert utilization[0, 0] == pytest.approx(run_rates.get_utilization(skus[0], asset))
+    assert utilization[1, 0] == 1000000
+    assert utilization[2, 0] == 1000000
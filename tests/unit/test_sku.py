@@ -1,8 +1,10 @@
-from src.domain.models import Demand, Sku
+from src.domain.models import Demand, Sku, SkuTable
 import pytest
 import pandas as pd
 import datetime as dt
 import math
+import dataclasses
+import pickle
 
 
 def test_sku_init(sku_values: dict):
@@ -174,3 +176,51 @@ def test_demand_for_year_and_month(lrop: pd.DataFrame):
                 )
 
     assert set(demand.demand_for_date(year_to_check, month_to_check)) == expected
+
+
+def test_demand_periods(lrop: pd.DataFrame):
+    assert Demand(lrop).periods() == [(2022, None), (2023, None)]
+
+    periods = Demand(lrop, months_to_offset=6, monthize_capacity=True).periods()
+
+    assert len(periods) == 24
+    assert periods[0] == (2021, 7)
+    assert periods[-1] == (2023, 6)
+
+
+def test_demand_pickles_without_skus(lrop: pd.DataFrame):
+    demand = Demand(lrop, months_to_offset=6, monthize_capacity=True)
+    expected = demand.data
+
+    restored = pickle.loads(pickle.dumps(demand))
+
+    assert restored._data is None
+    assert restored.data == expected
+    assert restored.periods() == demand.periods()
+
+
+def test_demand_period_index_covers_every_sku(lrop: pd.DataFrame):
+    demand = Demand(lrop, months_to_offset=6, monthize_capacity=True)
+
+    by_period = [set(demand.demand_for_date(*period)) for period in demand.periods()]
+
+    assert set().union(*by_period) == demand.data
+    assert sum(len(skus) for skus in by_period) == len(demand.data)
+    assert list(demand.demand_for_date(2030, 1)) == []
+
+
+def test_sku_table_round_trips_and_allocates(lrop: pd.DataFrame, asset):
+    skus = sorted(Demand(lrop).data, key=lambda sku: sku.material_number)
+    table = SkuTable.from_skus(skus)
+
+    assert table.frame["product"].dtype == "category"
+    assert table.to_skus() == skus
+
+    allocated = table.allocate([(0, asset.name, 600, 0.5), (0, None, 400, 0)])
+
+    assert allocated.to_skus({asset.name: asset, None: None}) == [
+        dataclasses.replace(
+            skus[0], doses=600, allocated_to=asset, percent_utilization=0.5
+        ),
+        dataclasses.replace(skus[0], doses=400, percent_utilization=0),
+    ]